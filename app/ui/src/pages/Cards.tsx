@@ -12,6 +12,7 @@ type Card = {
   sport?: string;
   updated_at: string;
   wishlisted?: boolean;
+  price?: { median_30d: number; last_amount: number; last_sale_date: string; sales_30d: number } | null;
 };
 
 type Side = "front" | "back";
@@ -19,11 +20,12 @@ type Pair = { front?: { thumb: string; full: string }; back?: { thumb: string; f
 type MediaMap = Record<string, Pair>;
 
 // Browse response fallbacks
-type SportsResp = { sports: string[] } | string[];
-type YearsResp = { years: number[] } | number[];
+type SportsResp = { sports: string[]; counts?: Record<string, number> } | string[];
+type YearsResp = { years: number[]; counts?: Record<string, number> } | number[];
 type ProductsResp =
-  | { products: (string | { label: string })[] }
-  | (string | { label: string })[];
+  | { products: (string | { label: string; count?: number })[] }
+  | (string | { label: string; count?: number })[];
+type Counts = Record<string, number>;
 
 export default function CardsPage() {
   // -------- query & paging ----------
@@ -47,6 +49,9 @@ export default function CardsPage() {
   const [sports, setSports] = useState<string[]>([]);
   const [years, setYears] = useState<number[]>([]);
   const [products, setProducts] = useState<string[]>([]);
+  const [facetCounts, setFacetCounts] = useState<{ sports: Counts; years: Counts; products: Counts }>({
+    sports: {}, years: {}, products: {},
+  });
   const [selSport, setSelSport] = useState<string | null>(null);
   const [selYear, setSelYear] = useState<number | null>(null);
   const [selProduct, setSelProduct] = useState<string | null>(null);
@@ -55,8 +60,8 @@ export default function CardsPage() {
   async function load() {
     setLoading(true);
     try {
-      const params: any = { page, page_size: pageSize };
-      if (q) params.q = q;
+      const params: any = { page, page_size: pageSize, media: true, prices: true };
+      if (q) { params.q = q; params.sort = "relevance"; }
 
       const r = await api.get("/v1/cards", { params });
 
@@ -71,23 +76,16 @@ export default function CardsPage() {
       setCards(items);
       setTotal(totalCount);
 
-      // Load media pairs per row
-      const pairs = await Promise.all(
-        items.map(async (c) => {
-          try {
-            const resp = await api.get<{ front: any; back: any }>("/v1/media/pair", {
-              params: { card_uuid: c.card_uuid },
-            });
-            const toAbs = (u?: string | null) => (u ? `${import.meta.env.VITE_API_BASE_URL}${u}` : "");
-            const pair: Pair = {};
-            if (resp.data.front) pair.front = { thumb: toAbs(resp.data.front.thumb_url), full: toAbs(resp.data.front.url) };
-            if (resp.data.back) pair.back = { thumb: toAbs(resp.data.back.thumb_url), full: toAbs(resp.data.back.url) };
-            return [c.card_uuid, pair] as const;
-          } catch {
-            return [c.card_uuid, {} as Pair] as const;
-          }
-        })
-      );
+      // Media pairs come embedded in the list response (one query server-side)
+      const embedded: Record<string, { front: any; back: any }> = Array.isArray(r.data) ? {} : r.data.media ?? {};
+      const toAbs = (u?: string | null) => (u ? `${import.meta.env.VITE_API_BASE_URL}${u}` : "");
+      const pairs = items.map((c) => {
+        const m = embedded[c.card_uuid];
+        const pair: Pair = {};
+        if (m?.front) pair.front = { thumb: toAbs(m.front.thumb_url), full: toAbs(m.front.url) };
+        if (m?.back) pair.back = { thumb: toAbs(m.back.thumb_url), full: toAbs(m.back.url) };
+        return [c.card_uuid, pair] as const;
+      });
       setMedia(Object.fromEntries(pairs));
     } finally {
       setLoading(false);
@@ -106,6 +104,7 @@ export default function CardsPage() {
         const r = await api.get<SportsResp>("/v1/cards/browse/sports");
         const list = Array.isArray(r.data) ? r.data : (r.data as any).sports ?? [];
         setSports(list);
+        setFacetCounts((c) => ({ ...c, sports: (r.data as any).counts ?? {} }));
       } catch { /* ignore */ }
     })();
   }, []);
@@ -120,6 +119,7 @@ export default function CardsPage() {
         // FIX: de-duplicate and sort newest first
         const uniqYears = Array.from(new Set(list)).sort((a, b) => b - a);
         setYears(uniqYears);
+        setFacetCounts((c) => ({ ...c, years: (r.data as any).counts ?? {} }));
       } catch { setYears([]); }
       setProducts([]); setSelYear(null); setSelProduct(null);
     })();
@@ -136,6 +136,9 @@ export default function CardsPage() {
         // FIX: de-duplicate product list (previously could render duplicates)
         const uniqProducts = Array.from(new Set(normalized));
         setProducts(uniqProducts);
+        const counts: Counts = {};
+        raw.forEach((p: any) => { if (p && typeof p === "object" && p.count != null) counts[p.label] = p.count; });
+        setFacetCounts((c) => ({ ...c, products: counts }));
       } catch { setProducts([]); }
       setSelProduct(null);
     })();
@@ -192,6 +195,20 @@ export default function CardsPage() {
     setCards(prev => prev.map(c => c.card_uuid === card_uuid ? { ...c, wishlisted: !current } : c));
   }
 
+  // whole page at once: one request, one transaction server-side
+  async function wishlistShown(wishlisted: boolean) {
+    const card_uuids = cards.map((c) => c.card_uuid);
+    if (!card_uuids.length) return;
+    await api.post("/v1/cards/bulk/wishlist", { card_uuids, wishlisted });
+    setCards((prev) => prev.map((c) => ({ ...c, wishlisted })));
+  }
+
+  async function ownShown() {
+    if (!cards.length || !confirm(`Add ${cards.length} card(s) to your collection?`)) return;
+    const { data } = await api.post("/v1/ownership/bulk", { items: cards.map((c) => ({ card_uuid: c.card_uuid })) });
+    alert(`Added ${data.created} card(s) to your collection`);
+  }
+
   // -------- small UI bits ----------
   function ToolbarButton(props: React.ButtonHTMLAttributes<HTMLButtonElement>) {
     const { className = "", ...rest } = props;
@@ -372,8 +389,20 @@ export default function CardsPage() {
                 try {
                   const r = await api.post("/v1/import/cards.csv", fd, {
                     headers: { "Content-Type": "multipart/form-data" },
+                    params: { background: true },
                   });
-                  alert(`Imported: ${r.data.created} (errors: ${r.data.errors})`);
+                  // large files run as a server job; poll until it finishes
+                  let job = (await api.get(`/v1/jobs/${r.data.job_id}`)).data;
+                  while (job.status === "queued" || job.status === "running") {
+                    await new Promise((res) => setTimeout(res, 1000));
+                    job = (await api.get(`/v1/jobs/${r.data.job_id}`)).data;
+                  }
+                  if (job.status !== "done") {
+                    alert(`Import ${job.status}${job.error ? `: ${job.error}` : ""}`);
+                  } else {
+                    const res = job.result;
+                    alert(`Imported: ${res.created} new, ${res.updated} updated, ${res.skipped} skipped (errors: ${res.errors})`);
+                  }
                   setPage(1);
                   await load();
                 } finally { input.value = ""; }
@@ -406,6 +435,7 @@ export default function CardsPage() {
               }`}
             >
               {s}
+              {facetCounts.sports[s] != null && <span className="ml-1 text-xs text-neutral-400">{facetCounts.sports[s]}</span>}
             </button>
           ))}
         </div>
@@ -422,6 +452,7 @@ export default function CardsPage() {
                 }`}
               >
                 {y}
+                {facetCounts.years[y] != null && <span className="ml-1 text-xs text-neutral-400">{facetCounts.years[y]}</span>}
               </button>
             ))}
           </div>
@@ -439,6 +470,7 @@ export default function CardsPage() {
                 }`}
               >
                 {p}
+                {facetCounts.products[p] != null && <span className="ml-1 text-xs text-neutral-400">{facetCounts.products[p]}</span>}
               </button>
             ))}
           </div>
@@ -452,6 +484,14 @@ export default function CardsPage() {
             {selProduct ? <> &gt; <span className="text-neutral-200">{selProduct}</span></> : null}
           </div>
         )}
+
+        {selProduct && cards.length > 0 && (
+          <div className="flex flex-wrap gap-2">
+            <ToolbarButton onClick={() => wishlistShown(true)}>Wishlist shown</ToolbarButton>
+            <ToolbarButton onClick={() => wishlistShown(false)}>Unwishlist shown</ToolbarButton>
+            <ToolbarButton onClick={ownShown}>Mark shown as owned</ToolbarButton>
+          </div>
+        )}
       </div>
 
       {/* Quick-add form */}
@@ -488,6 +528,7 @@ export default function CardsPage() {
               <th>No.</th>
               <th>Player</th>
               <th>Sport</th>
+              <th className="text-right">Market</th>
               <th>Media (Front / Back)</th>
               <th></th>
             </tr>
@@ -506,6 +547,12 @@ export default function CardsPage() {
                   <td className="px-3 py-2">{c.card_no ?? ""}</td>
                   <td className="px-3 py-2">{c.player ?? ""}</td>
                   <td className="px-3 py-2">{c.sport ?? ""}</td>
+                  <td
+                    className="px-3 py-2 text-right tabular-nums"
+                    title={c.price ? `Last sold ${c.price.last_sale_date}: $${c.price.last_amount.toFixed(2)} · ${c.price.sales_30d} sale(s) in 30 days` : ""}
+                  >
+                    {c.price ? `$${c.price.median_30d.toFixed(2)}` : ""}
+                  </td>
                   <td className="px-3 py-2">
                     <div className="flex items-center gap-3">
                       {pair.front?.thumb ? (
@@ -17,14 +17,24 @@ type Ownership = {
   card?: { year?: number; brand?: string; set_name?: string; card_no?: string; player?: string; sport?: string };
 };
 
+type OwnershipPage = { items: Ownership[]; total: number; next_after: string | null };
+
 export default function OwnershipPage() {
   const [rows, setRows] = useState<Ownership[]>([]);
+  const [total, setTotal] = useState(0);
+  const [nextAfter, setNextAfter] = useState<string | null>(null);
   const [q, setQ] = useState("");
   const [form, setForm] = useState<any>({}); // keep your current form shape
 
-  async function load() {
-    const { data } = await api.get<Ownership[]>("/v1/ownership", { params: q ? { q } : {} });
-    setRows(data);
+  // server-side search + keyset paging; each row comes with its card embedded
+  async function load(after?: string) {
+    const params: any = { page_size: 100 };
+    if (q) params.q = q;
+    if (after) params.after = after;
+    const { data } = await api.get<OwnershipPage>("/v1/ownership", { params });
+    setRows((prev) => (after ? [...prev, ...data.items] : data.items));
+    setTotal(data.total);
+    setNextAfter(data.next_after);
   }
   useEffect(() => { load(); }, []);
   useEffect(() => { const t = setTimeout(load, 300); return () => clearTimeout(t); }, [q]);
@@ -48,7 +58,7 @@ export default function OwnershipPage() {
       <Toolbar>
         <div className="space-y-1">
           <h1 className="text-2xl font-semibold">Ownership</h1>
-          <p className="text-sm text-neutral-400">{rows.length} record{rows.length === 1 ? "" : "s"}</p>
+          <p className="text-sm text-neutral-400">{total} record{total === 1 ? "" : "s"}</p>
         </div>
 
         <div className="flex w-full items-center gap-2 sm:w-auto">
@@ -139,6 +149,11 @@ export default function OwnershipPage() {
         {rows.length === 0 && (
           <div className="border-t border-neutral-800 p-6 text-center text-sm text-neutral-400">No ownership records yet.</div>
         )}
+        {nextAfter && (
+          <div className="border-t border-neutral-800 p-3 text-center">
+            <ActionButton onClick={() => load(nextAfter)}>Load more</ActionButton>
+          </div>
+        )}
       </TableShell>
     </PageShell>
   );
@@ -0,0 +1,31 @@
+"""ownership: card and live listing indexes
+
+Revision ID: 24407ced9033
+Revises: 450282059e54
+Create Date: 2026-10-17 20:41:09.553182
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '24407ced9033'
+down_revision: Union[str, Sequence[str], None] = '450282059e54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_ownership_card_live', 'ownership', ['card_uuid', 'deleted_at'], unique=False)
+    op.create_index('ix_ownership_live_updated_at', 'ownership', ['updated_at', 'ownership_uuid'],
+                    unique=False, sqlite_where=sa.text('deleted_at IS NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ownership_live_updated_at', table_name='ownership')
+    op.drop_index('ix_ownership_card_live', table_name='ownership')
@@ -0,0 +1,43 @@
+"""price_stats: materialized per-card sale statistics by grade
+
+Revision ID: 450282059e54
+Revises: cef39767c70a
+Create Date: 2026-10-17 19:58:20.117409
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '450282059e54'
+down_revision: Union[str, Sequence[str], None] = 'cef39767c70a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('price_stats',
+    sa.Column('card_uuid', sa.String(), nullable=False),
+    sa.Column('grade_key', sa.String(), nullable=False),
+    sa.Column('updated_at', sa.String(), nullable=False),
+    sa.Column('sales', sa.Integer(), nullable=False),
+    sa.Column('last_sale_date', sa.String(), nullable=False),
+    sa.Column('last_amount', sa.Float(), nullable=False),
+    sa.Column('median_30d', sa.Float(), nullable=False),
+    sa.Column('sales_30d', sa.Integer(), nullable=False),
+    sa.Column('min_amount', sa.Float(), nullable=False),
+    sa.Column('max_amount', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['card_uuid'], ['cards.card_uuid'], ),
+    sa.PrimaryKeyConstraint('card_uuid', 'grade_key')
+    )
+    op.create_index('ix_price_stats_grade_median', 'price_stats', ['grade_key', 'median_30d', 'card_uuid'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_price_stats_grade_median', table_name='price_stats')
+    op.drop_table('price_stats')
@@ -0,0 +1,38 @@
+"""import_manifest for incremental CardLists imports
+
+Revision ID: 4e0929c6a69a
+Revises: 7d960b5f4712
+Create Date: 2026-10-17 11:20:52.906113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e0929c6a69a'
+down_revision: Union[str, Sequence[str], None] = '7d960b5f4712'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('import_manifest',
+    sa.Column('path', sa.String(), nullable=False),
+    sa.Column('created_at', sa.String(), nullable=False),
+    sa.Column('updated_at', sa.String(), nullable=False),
+    sa.Column('sport', sa.String(), nullable=True),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('mtime_ns', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(), nullable=False),
+    sa.Column('row_hashes_json', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('path')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('import_manifest')
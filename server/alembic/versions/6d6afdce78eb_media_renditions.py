@@ -0,0 +1,38 @@
+"""media_renditions: multi-size WebP/AVIF renditions per blob
+
+Revision ID: 6d6afdce78eb
+Revises: 9b7509cb831e
+Create Date: 2026-10-17 15:02:44.180316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d6afdce78eb'
+down_revision: Union[str, Sequence[str], None] = '9b7509cb831e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('media_renditions',
+    sa.Column('sha256', sa.String(), nullable=False),
+    sa.Column('size', sa.String(), nullable=False),
+    sa.Column('format', sa.String(), nullable=False),
+    sa.Column('created_at', sa.String(), nullable=False),
+    sa.Column('path', sa.Text(), nullable=False),
+    sa.Column('width', sa.Integer(), nullable=False),
+    sa.Column('height', sa.Integer(), nullable=False),
+    sa.Column('bytes', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('sha256', 'size', 'format')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('media_renditions')
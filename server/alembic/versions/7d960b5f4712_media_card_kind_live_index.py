@@ -0,0 +1,31 @@
+"""media: composite index for latest front/back lookups
+
+Revision ID: 7d960b5f4712
+Revises: 8ad849de119e
+Create Date: 2026-10-17 10:03:18.442871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d960b5f4712'
+down_revision: Union[str, Sequence[str], None] = '8ad849de119e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_media_card_kind_live', 'media',
+        ['card_uuid', 'kind', 'deleted_at', 'created_at'], unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_media_card_kind_live', table_name='media')
@@ -0,0 +1,67 @@
+"""cards: fts5 search index
+
+Revision ID: 8ad849de119e
+Revises: aa13de0b4e65
+Create Date: 2026-10-17 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8ad849de119e'
+down_revision: Union[str, Sequence[str], None] = 'aa13de0b4e65'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# keep in sync with FTS_COLUMNS in server/routers/cards.py
+FTS_COLUMNS = [
+    "player", "brand", "set_name", "subset", "card_no",
+    "team", "sport", "parallel", "variant", "notes",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    cols = ", ".join(FTS_COLUMNS)
+    new_cols = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+    old_cols = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+    # External-content table: the index lives in cards_fts, the text stays in cards.
+    # trigram gives case-insensitive substring matching, i.e. the same hits as ILIKE '%tok%'.
+    op.execute(
+        f"CREATE VIRTUAL TABLE cards_fts USING fts5("
+        f"{cols}, content='cards', content_rowid='rowid', tokenize='trigram')"
+    )
+
+    op.execute(f"""
+        CREATE TRIGGER cards_fts_ai AFTER INSERT ON cards BEGIN
+            INSERT INTO cards_fts(rowid, {cols}) VALUES (new.rowid, {new_cols});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER cards_fts_ad AFTER DELETE ON cards BEGIN
+            INSERT INTO cards_fts(cards_fts, rowid, {cols}) VALUES ('delete', old.rowid, {old_cols});
+        END
+    """)
+    # only re-index when a searchable column changes (wishlist toggles etc. stay cheap)
+    op.execute(f"""
+        CREATE TRIGGER cards_fts_au AFTER UPDATE OF {cols} ON cards BEGIN
+            INSERT INTO cards_fts(cards_fts, rowid, {cols}) VALUES ('delete', old.rowid, {old_cols});
+            INSERT INTO cards_fts(rowid, {cols}) VALUES (new.rowid, {new_cols});
+        END
+    """)
+
+    # backfill from existing rows
+    op.execute("INSERT INTO cards_fts(cards_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS cards_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS cards_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS cards_fts_ai")
+    op.execute("DROP TABLE IF EXISTS cards_fts")
@@ -0,0 +1,40 @@
+"""cards: partial indexes for live-card listing, sport/year filter and browse facets
+
+Revision ID: 8fc877ffd727
+Revises: f74df76b6681
+Create Date: 2026-10-17 18:05:36.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8fc877ffd727'
+down_revision: Union[str, Sequence[str], None] = 'f74df76b6681'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SORT_COLUMNS = ['updated_at', 'created_at', 'year', 'player', 'brand', 'set_name', 'card_no']
+LIVE = sa.text('deleted_at IS NULL')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for c in SORT_COLUMNS:
+        op.create_index(f'ix_cards_live_{c}', 'cards', [c, 'card_uuid'], unique=False, sqlite_where=LIVE)
+    op.create_index('ix_cards_live_sport_year', 'cards', [sa.text('lower(sport)'), 'year', 'updated_at'],
+                    unique=False, sqlite_where=LIVE)
+    op.create_index('ix_cards_live_browse', 'cards', ['sport', 'year', 'brand', 'set_name'],
+                    unique=False, sqlite_where=LIVE)
+    op.execute('ANALYZE cards')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cards_live_browse', table_name='cards')
+    op.drop_index('ix_cards_live_sport_year', table_name='cards')
+    for c in reversed(SORT_COLUMNS):
+        op.drop_index(f'ix_cards_live_{c}', table_name='cards')
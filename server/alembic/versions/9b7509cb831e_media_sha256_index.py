@@ -0,0 +1,28 @@
+"""media: sha256 index for content-addressed blob dedupe
+
+Revision ID: 9b7509cb831e
+Revises: 4e0929c6a69a
+Create Date: 2026-10-17 14:21:07.318520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b7509cb831e'
+down_revision: Union[str, Sequence[str], None] = '4e0929c6a69a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_media_sha256', 'media', ['sha256'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_media_sha256', table_name='media')
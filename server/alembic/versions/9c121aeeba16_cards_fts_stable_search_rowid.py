@@ -0,0 +1,90 @@
+"""cards: key cards_fts by a stable search_rowid
+
+Revision ID: 9c121aeeba16
+Revises: 24407ced9033
+Create Date: 2026-10-17 03:14:58.234943
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c121aeeba16'
+down_revision: Union[str, Sequence[str], None] = '24407ced9033'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# keep in sync with FTS_COLUMNS in server/routers/cards.py
+FTS_COLUMNS = [
+    "player", "brand", "set_name", "subset", "card_no",
+    "team", "sport", "parallel", "variant", "notes",
+]
+
+
+def _drop_fts() -> None:
+    op.execute("DROP TRIGGER IF EXISTS cards_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS cards_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS cards_fts_ai")
+    op.execute("DROP TABLE IF EXISTS cards_fts")
+
+
+def _create_fts(key: str) -> None:
+    cols = ", ".join(FTS_COLUMNS)
+    new_cols = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+    old_cols = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+    op.execute(
+        f"CREATE VIRTUAL TABLE cards_fts USING fts5("
+        f"{cols}, content='cards', content_rowid='{key}', tokenize='trigram')"
+    )
+    if key == "search_rowid":
+        # assigned once, so VACUUM can't move it; max + 1 can hand out a hard-deleted
+        # top value again, which is harmless since its index entry went with the row
+        op.execute(f"""
+            CREATE TRIGGER cards_fts_ai AFTER INSERT ON cards BEGIN
+                UPDATE cards SET search_rowid = (SELECT coalesce(max(search_rowid), 0) + 1 FROM cards)
+                    WHERE rowid = new.rowid;
+                INSERT INTO cards_fts(rowid, {cols})
+                    SELECT search_rowid, {new_cols} FROM cards WHERE rowid = new.rowid;
+            END
+        """)
+    else:
+        op.execute(f"""
+            CREATE TRIGGER cards_fts_ai AFTER INSERT ON cards BEGIN
+                INSERT INTO cards_fts(rowid, {cols}) VALUES (new.rowid, {new_cols});
+            END
+        """)
+    op.execute(f"""
+        CREATE TRIGGER cards_fts_ad AFTER DELETE ON cards BEGIN
+            INSERT INTO cards_fts(cards_fts, rowid, {cols}) VALUES ('delete', old.{key}, {old_cols});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER cards_fts_au AFTER UPDATE OF {cols} ON cards BEGIN
+            INSERT INTO cards_fts(cards_fts, rowid, {cols}) VALUES ('delete', old.{key}, {old_cols});
+            INSERT INTO cards_fts(rowid, {cols}) VALUES (new.{key}, {new_cols});
+        END
+    """)
+    op.execute("INSERT INTO cards_fts(cards_fts) VALUES ('rebuild')")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # cards has a TEXT primary key, so its rowid is implicit and VACUUM may
+    # renumber it, silently pointing the external-content index at other cards.
+    _drop_fts()
+    op.add_column('cards', sa.Column('search_rowid', sa.Integer(), nullable=True))
+    op.execute("UPDATE cards SET search_rowid = rowid")
+    op.create_index('ux_cards_search_rowid', 'cards', ['search_rowid'], unique=True)
+    _create_fts("search_rowid")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _drop_fts()
+    op.drop_index('ux_cards_search_rowid', table_name='cards')
+    op.drop_column('cards', 'search_rowid')
+    _create_fts("rowid")
@@ -0,0 +1,29 @@
+"""prices: (card_uuid, sale_date) index for price history and bulk ingest dedupe
+
+Revision ID: cef39767c70a
+Revises: 8fc877ffd727
+Create Date: 2026-10-17 19:12:44.581020
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cef39767c70a'
+down_revision: Union[str, Sequence[str], None] = '8fc877ffd727'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_prices_card_sale', 'prices',
+                    ['card_uuid', 'sale_date', 'source_market', 'amount_all_in'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_prices_card_sale', table_name='prices')
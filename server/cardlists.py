@@ -0,0 +1,451 @@
+# server/cardlists.py
+"""
+CardLists (junkwaxdata) release JSON -> cards. Shared by scripts/import_cardlists.py
+and the background job runner (server/jobs.py).
+"""
+import json, os, re, uuid, time, hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Dict, Any, Optional, List, Tuple, Set, Callable
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .db import SessionLocal
+from .models import Card, ImportManifest
+
+SPORT_DIRS = {
+    "baseball":   "Baseball",
+    "basketball": "Basketball",
+    "football":   "Football",
+    "hockey":     "Hockey",
+}
+
+def now_utc() -> str:
+    # ISO-8601 Z time, second precision
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+def parse_brand(release_name: str) -> str:
+    """
+    Try to extract the brand from titles like:
+      '1981 Donruss Baseball' -> 'Donruss'
+      '1990-91 Upper Deck Hockey' -> 'Upper Deck'
+      'Topps Chrome Baseball' -> 'Topps Chrome'
+    Fallback: remove leading years, return first non-numeric token(s).
+    """
+    s = (release_name or "").strip()
+
+    # Remove leading year patterns (e.g., "1981 ", "1990-91 ")
+    s = re.sub(r"^\s*\d{4}(?:-\d{2})?\s+", "", s)
+
+    # Remove trailing explicit sport words to isolate brand
+    s = re.sub(r"\s+(Baseball|Basketball|Football|Hockey)\s*$", "", s, flags=re.I)
+
+    # Compact remaining whitespace
+    s = re.sub(r"\s+", " ", s).strip()
+
+    # If nothing left, fallback
+    return s or (release_name or "").strip()
+
+def ensure_str(x: Optional[str]) -> Optional[str]:
+    if x is None:
+        return None
+    s = str(x).strip()
+    return s or None
+
+def find_year_from_path(path: str) -> Optional[int]:
+    m = re.search(r"(19|20)\d{2}", path.replace("\\", "/"))
+    return int(m.group()) if m else None
+
+def build_canonical(d: Dict[str, Any]) -> str:
+    parts = [
+        str(d.get("year") or "").strip().lower(),
+        (d.get("brand") or "").strip().lower(),
+        (d.get("set_name") or "").strip().lower(),
+        (d.get("card_no") or "").strip().lower(),
+        (d.get("player") or "").strip().lower(),
+    ]
+    return "|".join(parts)
+
+def import_release(path: str, sport: str) -> Iterator[Dict[str, Any]]:
+    """Yield card rows parsed from a single release JSON file, de-duplicated."""
+    with open(path, "r", encoding="utf-8") as f:
+        rel = json.load(f)
+
+    release_name = rel.get("name") or ""
+    brand = parse_brand(release_name)
+    year = find_year_from_path(path)
+
+    seen_in_release: Set[str] = set()
+
+    for s in rel.get("sets", []) or []:
+        subset = s.get("name")
+        numbered = s.get("numberedTo")
+        for c in s.get("cards", []) or []:
+            attrs = c.get("attributes") or []
+            d = {
+                "external_source": "junkwaxdata",
+                "external_id": ensure_str(c.get("uniqueId")),
+
+                "sport": sport,
+                "year": year,
+                "brand": brand,
+                "set_name": release_name,
+                "subset": ensure_str(subset),
+
+                "card_no": ensure_str(c.get("number")),
+                "player": ensure_str(c.get("name")),
+                "print_run": numbered if isinstance(numbered, int) else None,
+
+                "attributes_json": json.dumps(attrs) if attrs else None,
+                "variations_json": json.dumps(c.get("variations") or None),
+                "parallels_json": json.dumps(c.get("parallels") or None),
+            }
+
+            key = build_canonical(d)
+            if key in seen_in_release:
+                # same card repeated within the JSON (e.g., parallel/attribute duplicate) → skip
+                continue
+            seen_in_release.add(key)
+            yield d
+
+def parse_release_file(job: Tuple[str, str]) -> List[Tuple[str, Dict[str, Any]]]:
+    """Parse + normalize one release file into (canonical_key, row) pairs. Runs in pool workers."""
+    path, sport = job
+    return [(build_canonical(d), d) for d in import_release(path, sport)]
+
+def iter_parsed_releases(
+    pairs: List[Tuple[str, str]],
+    workers: int = 1,
+) -> Iterator[Tuple[str, str, List[Tuple[str, Dict[str, Any]]]]]:
+    """
+    Yield (path, sport, rows) in the same order as pairs. With workers > 1 the
+    files are parsed ahead in a process pool, at most 2*workers in flight, so
+    the single writer sees exactly the serial order (global_seen dedupe is
+    unchanged) while memory stays bounded.
+    """
+    if workers <= 1:
+        for job in pairs:
+            yield job[0], job[1], parse_release_file(job)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = iter(pairs)
+        window = deque()
+        for job in jobs:
+            window.append((job, pool.submit(parse_release_file, job)))
+            if len(window) >= workers * 2:
+                break
+        while window:
+            job, fut = window.popleft()
+            nxt = next(jobs, None)
+            if nxt is not None:
+                window.append((nxt, pool.submit(parse_release_file, nxt)))
+            yield job[0], job[1], fut.result()
+
+def safe_set(obj, name: str, value):
+    if hasattr(obj, name):
+        setattr(obj, name, value)
+
+def upsert_card(db, d: Dict[str, Any], cache: Dict[str, Card]) -> str:
+    """Insert/update a Card row by canonical key with an in-memory cache to avoid duplicates before commit."""
+    canonical = build_canonical(d)
+
+    row = cache.get(canonical)
+    if row is None:
+        row = db.query(Card).filter_by(tenant_id="local", canonical_key=canonical).first()
+    created = False
+
+    if row is None:
+        row = Card(
+            card_uuid=f"c_{uuid.uuid4()}",
+            tenant_id="local",
+            schema_version="v1",
+            created_at=now_utc(),
+            updated_at=now_utc(),
+            canonical_key=canonical,
+        )
+        db.add(row)
+        # Keep it visible to subsequent queries and our cache even before commit
+        db.flush()
+        cache[canonical] = row
+        created = True
+    else:
+        cache[canonical] = row  # ensure cache points to the found row
+
+    row.sport     = d.get("sport")
+    row.year      = d.get("year")
+    row.brand     = d.get("brand")
+    row.set_name  = d.get("set_name")
+    row.subset    = d.get("subset")
+    row.card_no   = d.get("card_no")
+    row.player    = d.get("player")
+    row.print_run = d.get("print_run")
+
+    safe_set(row, "external_source", d.get("external_source"))
+    safe_set(row, "external_id", d.get("external_id"))
+    safe_set(row, "attributes_json", d.get("attributes_json"))
+    safe_set(row, "variations_json", d.get("variations_json"))
+    safe_set(row, "parallels_json", d.get("parallels_json"))
+
+    row.updated_at = now_utc()
+    return "created" if created else "updated"
+
+# Card columns written from a parsed release row (same set upsert_card assigns)
+UPSERT_FIELDS = [
+    "sport", "year", "brand", "set_name", "subset", "card_no", "player", "print_run",
+    "external_source", "external_id", "attributes_json", "variations_json", "parallels_json",
+]
+
+def preload_canonical_keys(db) -> Dict[str, str]:
+    """canonical_key -> card_uuid for every local card, in one scan."""
+    rows = db.execute(
+        select(Card.canonical_key, Card.card_uuid)
+        .where(Card.tenant_id == "local", Card.canonical_key.isnot(None))
+    )
+    return {k: u for k, u in rows}
+
+class BulkUpserter:
+    """
+    Set-based alternative to upsert_card: buffers rows and writes them as
+    INSERT ... ON CONFLICT(tenant_id, canonical_key) DO UPDATE through
+    executemany, one commit per batch. Existing keys are preloaded so
+    created/updated can be counted without a SELECT per card.
+    """
+
+    def __init__(self, db, batch_size: int = 5000, dry_run: bool = False):
+        self.db = db
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.known = preload_canonical_keys(db)
+        self.pending: List[Dict[str, Any]] = []
+        self.created = 0
+        self.updated = 0
+
+        ins = sqlite_insert(Card.__table__)
+        self.stmt = ins.on_conflict_do_update(
+            index_elements=["tenant_id", "canonical_key"],
+            set_={f: ins.excluded[f] for f in UPSERT_FIELDS + ["updated_at"]},
+        )
+
+    def add(self, d: Dict[str, Any]) -> str:
+        canonical = build_canonical(d)
+        card_uuid = self.known.get(canonical)
+        if card_uuid is None:
+            card_uuid = f"c_{uuid.uuid4()}"
+            self.known[canonical] = card_uuid
+            self.created += 1
+            status = "created"
+        else:
+            self.updated += 1
+            status = "updated"
+
+        ts = now_utc()
+        row = {f: d.get(f) for f in UPSERT_FIELDS}
+        row.update(
+            card_uuid=card_uuid,
+            tenant_id="local",
+            schema_version="v1",
+            created_at=ts,      # ignored on conflict
+            updated_at=ts,
+            canonical_key=canonical,
+        )
+        self.pending.append(row)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        return status
+
+    def flush(self):
+        if self.pending and not self.dry_run:
+            self.db.execute(self.stmt, self.pending)
+            self.db.commit()
+        self.pending = []
+
+# ---------- incremental re-import (manifest) ----------
+def file_fingerprint(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def row_fingerprint(d: Dict[str, Any]) -> str:
+    """Hash of the fields we write, so unchanged cards aren't rewritten (or re-stamped)."""
+    raw = json.dumps([d.get(f) for f in UPSERT_FIELDS], separators=(",", ":"), default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def load_manifest(db) -> Dict[str, ImportManifest]:
+    return {m.path: m for m in db.query(ImportManifest).all()}
+
+def plan_releases(
+    pairs: List[Tuple[str, str]],
+    manifest: Dict[str, ImportManifest],
+) -> Tuple[List[Tuple[str, str]], Dict[int, ImportManifest], Dict[str, Tuple[int, int, str]]]:
+    """
+    Split pairs into files to parse and files to skip. A file is skipped when
+    size+mtime match the manifest, or when only mtime moved but the content
+    hash is the same. Returns (todo, skipped by index, (size, mtime_ns, sha) per todo path).
+    """
+    todo: List[Tuple[str, str]] = []
+    skipped: Dict[int, ImportManifest] = {}
+    stamps: Dict[str, Tuple[int, int, str]] = {}
+    for idx, (path, sport) in enumerate(pairs):
+        st = os.stat(path)
+        entry = manifest.get(os.path.abspath(path))
+        if entry and entry.size_bytes == st.st_size and entry.mtime_ns == st.st_mtime_ns:
+            skipped[idx] = entry
+            continue
+        sha = file_fingerprint(path)
+        if entry and entry.sha256 == sha:
+            entry.size_bytes, entry.mtime_ns = st.st_size, st.st_mtime_ns   # touched, not changed
+            skipped[idx] = entry
+            continue
+        stamps[path] = (st.st_size, st.st_mtime_ns, sha)
+        todo.append((path, sport))
+    return todo, skipped, stamps
+
+def record_manifest(
+    db,
+    manifest: Dict[str, ImportManifest],
+    path: str,
+    sport: str,
+    stamp: Tuple[int, int, str],
+    row_hashes: Dict[str, str],
+) -> None:
+    key = os.path.abspath(path)
+    entry = manifest.get(key)
+    if entry is None:
+        entry = ImportManifest(path=key, created_at=now_utc())
+        db.add(entry)
+        manifest[key] = entry
+    entry.sport = sport
+    entry.size_bytes, entry.mtime_ns, entry.sha256 = stamp
+    entry.row_hashes_json = json.dumps(row_hashes, separators=(",", ":"))
+    entry.updated_at = now_utc()
+
+def list_release_files_under_root(
+    root: str,
+    only_sport: Optional[str],
+    include_categories: bool = False,
+) -> List[Tuple[str, str]]:
+    files: List[Tuple[str, str]] = []
+    for sd, sport_name in SPORT_DIRS.items():
+        if only_sport and sport_name.lower() != only_sport.lower():
+            continue
+        sport_dir = os.path.join(root, sd)
+        if not os.path.isdir(sport_dir):
+            continue
+        for dirpath, _, filenames in os.walk(sport_dir):
+            norm = dirpath.replace("\\", "/").lower()
+            if ("/categories" in norm) and (not include_categories):
+                continue
+            for fn in filenames:
+                if fn.lower().endswith(".json"):
+                    files.append((os.path.join(dirpath, fn), sport_name))
+    return files
+
+
+def run_import(
+    pairs: List[Tuple[str, str]],
+    engine: str = "orm",
+    workers: int = 1,
+    incremental: bool = False,
+    commit_every: int = 500,
+    batch_size: int = 5000,
+    dry_run: bool = False,
+    verbose: bool = False,
+    progress: Optional[Callable[[int, int, int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Import (path, sport) release files. progress(files_done, files_total, rows_done)
+    is called after each file; raising from it aborts the run (batches already
+    committed stay committed).
+    """
+    db = SessionLocal()
+    created = updated = unchanged = 0
+    cache: Dict[str, Card] = {}
+    global_seen: Set[str] = set()  # prevents duplicates across files within the same run
+    bulk = BulkUpserter(db, batch_size, dry_run) if engine == "bulk" else None
+    started = time.perf_counter()
+
+    def rows_so_far() -> int:
+        return unchanged + (bulk.created + bulk.updated if bulk else created + updated)
+
+    try:
+        manifest: Dict[str, ImportManifest] = {}
+        skipped: Dict[int, ImportManifest] = {}
+        stamps: Dict[str, Tuple[int, int, str]] = {}
+        todo = pairs
+        if incremental:
+            manifest = load_manifest(db)
+            todo, skipped, stamps = plan_releases(pairs, manifest)
+            if verbose:
+                print(f"{len(todo)} new/changed, {len(skipped)} unchanged release file(s).")
+        parsed = iter_parsed_releases(todo, workers)
+
+        batch = 0
+        for i, (path, sport) in enumerate(pairs, 1):
+            if verbose and i % 25 == 0:
+                print(f"[{i}/{len(pairs)}] {sport} :: {path}")
+
+            entry = skipped.get(i - 1)
+            if entry is not None:
+                # still claim its keys so later files dedupe exactly as in a full run
+                global_seen.update(json.loads(entry.row_hashes_json or "{}"))
+                if progress:
+                    progress(i, len(pairs), rows_so_far())
+                continue
+
+            _, _, rows = next(parsed)
+            prev = manifest.get(os.path.abspath(path))
+            old_hashes = json.loads(prev.row_hashes_json or "{}") if prev else {}
+            row_hashes: Dict[str, str] = {}
+            for key, d in rows:
+                if key in global_seen:
+                    continue
+                global_seen.add(key)
+
+                if incremental:
+                    h = row_hashes[key] = row_fingerprint(d)
+                    if old_hashes.get(key) == h:
+                        unchanged += 1
+                        continue
+
+                if bulk:
+                    bulk.add(d)
+                    continue
+
+                status = upsert_card(db, d, cache)
+                if status == "created": created += 1
+                else: updated += 1
+
+                batch += 1
+                if not dry_run and batch >= commit_every:
+                    db.commit()
+                    batch = 0
+
+            if incremental:
+                # committed together with this file's rows (same session, added after them)
+                record_manifest(db, manifest, path, sport, stamps[path], row_hashes)
+            if progress:
+                progress(i, len(pairs), rows_so_far())
+
+        if bulk:
+            bulk.flush()
+            created, updated = bulk.created, bulk.updated
+        if not dry_run:
+            db.commit()
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "releases": len(pairs),
+        "created": created,
+        "updated": updated,
+        "skipped_files": len(skipped),
+        "unchanged": unchanged,
+        "elapsed": elapsed,
+        "rows_per_sec": (created + updated) / elapsed if elapsed > 0 else 0.0,
+    }
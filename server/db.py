@@ -1,5 +1,6 @@
 # server/db.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from .settings import settings
 
@@ -8,6 +9,34 @@ class Base(DeclarativeBase):
 
 engine = create_engine(
     f"sqlite+pysqlite:///{settings.db_path}",
-    connect_args={"check_same_thread": False},
+    connect_args={
+        "check_same_thread": False,
+        "timeout": settings.sqlite_busy_timeout_ms / 1000,
+    },
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
 )
+
+# Async engine for the hot read paths (aiosqlite runs each connection on its own thread)
+async_engine = create_async_engine(
+    f"sqlite+aiosqlite:///{settings.db_path}",
+    connect_args={"timeout": settings.sqlite_busy_timeout_ms / 1000},
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+)
+
+def _apply_sqlite_profile(dbapi_conn, _record):
+    cur = dbapi_conn.cursor()
+    cur.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cur.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cur.execute(f"PRAGMA cache_size={-int(settings.sqlite_cache_size_kb)}")  # negative = KiB
+    cur.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cur.execute(f"PRAGMA temp_store={settings.sqlite_temp_store}")
+    cur.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cur.close()
+
+event.listen(engine, "connect", _apply_sqlite_profile)
+event.listen(async_engine.sync_engine, "connect", _apply_sqlite_profile)
+
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
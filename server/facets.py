@@ -0,0 +1,125 @@
+# server/facets.py
+"""
+Cached sport -> year -> product tree with card counts for the browse
+drill-down. Built with one GROUP BY over live cards, then kept current by
+single-card writes (apply) and rebuilt after bulk writes (invalidate) or
+once it is older than FACETS_MAX_AGE (the import script writes out of
+process).
+"""
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from .db import SessionLocal
+from .models import Card
+
+FACETS_MAX_AGE = 300   # seconds
+
+FacetKey = Tuple[Optional[str], Optional[int], Optional[str], Optional[str]]   # sport, year, brand, set_name
+
+def _norm(s: Optional[str]) -> str:
+    # collapse whitespace and trim
+    return re.sub(r"\s+", " ", s).strip() if s else ""
+
+def product_label(brand: Optional[str], set_name: Optional[str]) -> str:
+    """'Brand Set' label for the browse list; '' when the card has neither."""
+    b = _norm(brand)
+    s = _norm(set_name)
+    if b and s:
+        # If set_name already contains brand (anywhere, case-insensitive),
+        # don't duplicate the brand in the label.
+        return s if b.lower() in s.lower() else f"{b} {s}"
+    return s or b
+
+def facet_key(card: Card) -> FacetKey:
+    return (card.sport, card.year, card.brand, card.set_name)
+
+class BrowseFacets:
+    def __init__(self):
+        # {sport_lower: {"label", "count", "years": {year: {"count", "products": {label_lower: [label, count]}}}}}
+        self._tree: Optional[Dict[str, Dict[str, Any]]] = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def _add(self, tree, key: FacetKey, n: int):
+        sport, year, brand, set_name = key
+        sport = (sport or "").strip()
+        if not sport:
+            return
+        s = tree.setdefault(sport.lower(), {"label": sport, "count": 0, "years": {}})
+        s["count"] += n
+        if year is not None:
+            y = s["years"].setdefault(year, {"count": 0, "products": {}})
+            y["count"] += n
+            label = product_label(brand, set_name)
+            if label:
+                p = y["products"].setdefault(label.lower(), [label, 0])
+                p[1] += n
+                if p[1] <= 0:
+                    del y["products"][label.lower()]
+            if y["count"] <= 0:
+                del s["years"][year]
+        if s["count"] <= 0:
+            del tree[sport.lower()]
+
+    def _build(self):
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(Card.sport, Card.year, Card.brand, Card.set_name, func.count())
+                .where(Card.deleted_at.is_(None), Card.sport.isnot(None), Card.sport != "")
+                .group_by(Card.sport, Card.year, Card.brand, Card.set_name)
+            ).all()
+        finally:
+            db.close()
+        tree: Dict[str, Dict[str, Any]] = {}
+        for sport, year, brand, set_name, n in rows:
+            self._add(tree, (sport, year, brand, set_name), n)
+        return tree
+
+    def _current(self):
+        with self._lock:
+            if self._tree is not None and time.monotonic() - self._built_at < FACETS_MAX_AGE:
+                return self._tree
+        tree = self._build()
+        with self._lock:
+            self._tree, self._built_at = tree, time.monotonic()
+            return tree
+
+    def apply(self, before: Optional[FacetKey], after: Optional[FacetKey]):
+        """Move one card's count from before to after (None = not live)."""
+        with self._lock:
+            if self._tree is None:
+                return
+            if before is not None:
+                self._add(self._tree, before, -1)
+            if after is not None:
+                self._add(self._tree, after, 1)
+
+    def invalidate(self):
+        with self._lock:
+            self._tree = None
+
+    # ---- reads (blocking on the first build; call off the event loop) ----
+    def sports(self) -> List[Tuple[str, int]]:
+        tree = self._current()
+        with self._lock:
+            return sorted(((s["label"], s["count"]) for s in tree.values()), key=lambda t: t[0])
+
+    def years(self, sport: str) -> List[Tuple[int, int]]:
+        tree = self._current()
+        with self._lock:
+            s = tree.get(sport.strip().lower())
+            return sorted(((y, v["count"]) for y, v in s["years"].items()), reverse=True) if s else []
+
+    def products(self, sport: str, year: int) -> List[Tuple[str, int]]:
+        tree = self._current()
+        with self._lock:
+            s = tree.get(sport.strip().lower())
+            y = s["years"].get(year) if s else None
+            return sorted(((p[0], p[1]) for p in y["products"].values()), key=lambda t: t[0].lower()) if y else []
+
+browse_facets = BrowseFacets()
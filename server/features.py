@@ -0,0 +1,170 @@
+# server/features.py
+"""
+Compact image descriptors for matching a scan to a card. describe() turns an
+image into a 256-dim vector (phash bits, a 4x4x4 color histogram and a 4x4
+grid of 8-bin edge orientation histograms, each block L2-normalized) stored
+as float16 in media_features. VectorIndex holds the vectors of every live
+media row linked to a card in one NumPy matrix; a query is a single
+matrix-vector product plus argpartition.
+
+NumPy is optional: without it uploads skip the descriptor and the identify
+endpoints answer 501.
+"""
+import io
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .db import SessionLocal
+from .models import Media, MediaFeature, Ownership
+from .phash import phash
+
+DIMS = 256
+VERSION = 1                   # bump when describe() changes; stale rows are recomputed
+BLOCK_WEIGHTS = (1.0, 0.7, 1.0)   # phash, color, edges
+
+def numpy_or_none():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def describe(im: Image.Image, phash_hex: Optional[str] = None):
+    """Descriptor of an upright image as a unit-length float32 vector."""
+    import numpy as np
+
+    bits = int(phash_hex or phash(im), 16)
+    hash_block = np.array([1.0 if (bits >> (63 - i)) & 1 else -1.0 for i in range(64)], dtype=np.float32)
+
+    q = np.asarray(im.convert("RGB").resize((64, 64), Image.BILINEAR), dtype=np.uint8) // 64
+    color = np.sqrt(np.bincount((q[..., 0] * 16 + q[..., 1] * 4 + q[..., 2]).ravel(), minlength=64))
+
+    g = np.asarray(im.convert("L").resize((64, 64), Image.BILINEAR), dtype=np.float32)
+    gx = np.zeros_like(g)
+    gy = np.zeros_like(g)
+    gx[:, 1:-1] = g[:, 2:] - g[:, :-2]
+    gy[1:-1, :] = g[2:, :] - g[:-2, :]
+    orient = np.minimum((np.arctan2(gy, gx) % np.pi) / np.pi * 8, 7).astype(np.int64)
+    cell = np.arange(64) // 16
+    bins = (cell[:, None] * 4 + cell[None, :]) * 8 + orient
+    edges = np.bincount(bins.ravel(), weights=np.hypot(gx, gy).ravel(), minlength=128)
+
+    parts = []
+    for block, w in zip((hash_block, color, edges), BLOCK_WEIGHTS):
+        block = block.astype(np.float32)
+        n = np.linalg.norm(block)
+        parts.append(block * (w / n) if n else block)
+    v = np.concatenate(parts)
+    return v / np.linalg.norm(v)
+
+def describe_bytes(im: Image.Image, phash_hex: Optional[str] = None) -> Optional[bytes]:
+    """describe() as float16 bytes for media_features, or None without NumPy."""
+    if numpy_or_none() is None:
+        return None
+    return describe(im, phash_hex).astype("float16").tobytes()
+
+def describe_file(abs_path: str) -> Optional[bytes]:
+    """Worker-side: descriptor of a stored original or a spooled upload."""
+    with Image.open(abs_path) as src:
+        return describe_bytes(ImageOps.exif_transpose(src))
+
+def describe_upload(data: bytes) -> Optional[bytes]:
+    """Worker-side: descriptor of an uploaded image that is not stored."""
+    with Image.open(io.BytesIO(data)) as src:
+        return describe_bytes(ImageOps.exif_transpose(src))
+
+def feature_upsert(sha256: str, vector: bytes):
+    ins = sqlite_insert(MediaFeature.__table__).values(
+        sha256=sha256, version=VERSION, dims=DIMS, vector=vector,
+    )
+    return ins.on_conflict_do_update(
+        index_elements=["sha256"],
+        set_={"version": ins.excluded.version, "dims": ins.excluded.dims, "vector": ins.excluded.vector},
+    )
+
+def _card_rows(db, sha256: Optional[str] = None):
+    """(media_uuid, card_uuid, vector) for live media linked to a card, directly or via ownership."""
+    card = func.coalesce(Media.card_uuid, Ownership.card_uuid)
+    stmt = (
+        select(Media.media_uuid, card, MediaFeature.vector)
+        .join(MediaFeature, MediaFeature.sha256 == Media.sha256)
+        .outerjoin(Ownership, Ownership.ownership_uuid == Media.ownership_uuid)
+        .where(Media.deleted_at.is_(None), card.isnot(None), MediaFeature.version == VERSION)
+    )
+    if sha256 is not None:
+        stmt = stmt.where(Media.sha256 == sha256)
+    return db.execute(stmt).all()
+
+class VectorIndex:
+    """
+    In-memory matrix of card-linked media descriptors. Loaded at startup (or on
+    first use, so call search() off the event loop); new vectors are buffered and stacked into the matrix on the next
+    search. Rows deleted later stay until restart; callers filter against the DB.
+    """
+
+    def __init__(self):
+        self._mat = None                         # (N, DIMS) float32
+        self._keys: List[Tuple[str, str]] = []   # (media_uuid, card_uuid) per matrix row
+        self._pending: Dict[str, Tuple[str, bytes]] = {}
+        self._known = set()
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def add(self, media_uuid: str, card_uuid: str, vector: bytes):
+        with self._lock:
+            if media_uuid not in self._known:
+                self._known.add(media_uuid)
+                self._pending[media_uuid] = (card_uuid, vector)
+
+    def add_blob(self, db, sha256: str):
+        for media_uuid, card_uuid, vector in _card_rows(db, sha256):
+            self.add(media_uuid, card_uuid, vector)
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        db = SessionLocal()
+        try:
+            rows = _card_rows(db)
+        finally:
+            db.close()
+        with self._lock:
+            if not self._loaded:
+                for media_uuid, card_uuid, vector in rows:
+                    if media_uuid not in self._known:
+                        self._known.add(media_uuid)
+                        self._pending[media_uuid] = (card_uuid, vector)
+                self._loaded = True
+
+    def _flush(self, np):
+        if not self._pending:
+            return
+        new = np.frombuffer(b"".join(v for _, v in self._pending.values()), dtype=np.float16)
+        new = new.reshape(-1, DIMS).astype(np.float32)
+        self._mat = new if self._mat is None else np.vstack([self._mat, new])
+        self._keys.extend((m, c) for m, (c, _) in self._pending.items())
+        self._pending = {}
+
+    def search(self, query, k: int) -> List[Tuple[float, str, str]]:
+        """(cosine score, media_uuid, card_uuid) of the k nearest vectors, best first."""
+        import numpy as np
+
+        self.ensure_loaded()
+        with self._lock:
+            self._flush(np)
+            if self._mat is None:
+                return []
+            scores = self._mat @ query
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), *self._keys[i]) for i in top]
+
+    def stats(self) -> Dict[str, int]:
+        return {"vectors": len(self._keys) + len(self._pending)}
+
+index = VectorIndex()
@@ -0,0 +1,215 @@
+# server/images.py
+"""
+Image pipeline for uploaded media, run in a small process pool so Pillow's
+decode/encode work stays off the API workers. Each image is decoded once;
+its upright dimensions, perceptual hash, match descriptor and the eager
+renditions come from that single decode. Stored originals are never rewritten (their bytes are
+their sha256), EXIF orientation is applied to renditions only. Finished
+results are written back to every media row sharing the blob by a single
+writer thread, never on the pool's result thread, so a write waiting on the
+SQLite lock can't hold up other futures. Other
+renditions (sizes x WebP/AVIF) are rendered on first request and cached on
+disk.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .db import SessionLocal
+from .models import Media, MediaRendition
+from .features import describe_bytes, feature_upsert, index as vector_index
+from .phash import phash, index as phash_index
+from .settings import settings
+
+now = lambda: datetime.utcnow().isoformat(timespec="seconds") + "Z"
+log = logging.getLogger(__name__)
+
+EXIF_ORIENTATION = 0x0112
+
+# renditions: name -> longest side in px; all are generated lazily on first
+# request, EAGER_RENDITIONS also right after upload (the card grid thumbnail)
+RENDITION_SIZES = {"xs": 160, "sm": 320, "md": 640, "lg": 1280}
+RENDITION_FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "avif": ("AVIF", "image/avif", {"quality": 60}),
+}
+EAGER_RENDITIONS = [("sm", "webp")]
+
+WRITE_ATTEMPTS = 3     # per processed image, e.g. when the database stays locked past busy_timeout
+
+# a rendition target: (size name, format, absolute output path)
+Target = Tuple[str, str, str]
+
+def _write_atomic(im: Image.Image, path: str, fmt: str, **opts) -> int:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    im.save(tmp, fmt, **opts)
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+def _render(im: Image.Image, targets: List[Target]) -> Dict[Tuple[str, str], Tuple[int, int, int]]:
+    """Encode targets largest first, each downscaled from the previous one."""
+    out = {}
+    cur = im.convert("RGBA" if "A" in im.getbands() else "RGB")
+    for size, fmt, path in sorted(targets, key=lambda t: -RENDITION_SIZES[t[0]]):
+        side = RENDITION_SIZES[size]
+        cur.thumbnail((side, side))             # in place, never upscales
+        pil_fmt, _, opts = RENDITION_FORMATS[fmt]
+        out[(size, fmt)] = (cur.width, cur.height, _write_atomic(cur, path, pil_fmt, **opts))
+    return out
+
+def process_image(abs_path: str, targets: List[Target]):
+    """
+    Worker-side, after upload: upright dimensions, perceptual hash, descriptor
+    (when NumPy is installed) and eager renditions of abs_path, as a dict with
+    width, height, phash, features and renditions {(size, fmt): (w, h, bytes)}.
+    """
+    with Image.open(abs_path) as src:
+        rotated = src.getexif().get(EXIF_ORIENTATION, 1) != 1
+        im = ImageOps.exif_transpose(src) if rotated else src
+        im.load()
+        out = {"width": im.width, "height": im.height, "phash": phash(im)}
+        out["features"] = describe_bytes(im, out["phash"])
+
+        try:
+            out["renditions"] = _render(im, targets)
+        except Exception:
+            out["renditions"] = {}
+    return out
+
+def phash_file(abs_path: str) -> str:
+    """Worker-side: perceptual hash of a stored original (backfill)."""
+    with Image.open(abs_path) as src:
+        return phash(ImageOps.exif_transpose(src))
+
+def render_image(abs_path: str, targets: List[Target]):
+    """Worker-side, on demand: renditions of an already stored original."""
+    with Image.open(abs_path) as src:
+        return _render(ImageOps.exif_transpose(src), targets)
+
+def rendition_upsert(sha256: str, renditions, rel_paths: Dict[Tuple[str, str], str]):
+    """INSERT ... ON CONFLICT for media_renditions rows of one blob."""
+    ins = sqlite_insert(MediaRendition.__table__)
+    rows = [
+        {"sha256": sha256, "size": size, "format": fmt, "path": rel_paths[(size, fmt)],
+         "width": w, "height": h, "bytes": nbytes, "created_at": now()}
+        for (size, fmt), (w, h, nbytes) in renditions.items()
+    ]
+    stmt = ins.on_conflict_do_update(
+        index_elements=["sha256", "size", "format"],
+        set_={c: ins.excluded[c] for c in ("path", "width", "height", "bytes", "created_at")},
+    )
+    return stmt, rows
+
+class ImagePipeline:
+    """
+    Bounded front for the process pool: at most max_pending images are queued or
+    in flight; submit() blocks (call it off the event loop) once that is reached.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self._workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._results: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self._workers)
+            return self._pool
+
+    def submit(self, fn, *args) -> Future:
+        """Run fn(*args) in a worker process once a slot is free."""
+        self._slots.acquire()
+        try:
+            fut = self._get_pool().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda f: self._slots.release())
+        return fut
+
+    def process_upload(self, sha256: str, abs_path: str, targets: List[Target], rel_paths):
+        """process_image() for a new blob; results are recorded on its media rows."""
+        self._start_writer()
+        fut = self.submit(process_image, abs_path, targets)
+        fut.add_done_callback(lambda f: self._results.put((sha256, _result_or_blank(f), rel_paths)))
+        return fut
+
+    def _start_writer(self):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_results, name="image-writer", daemon=True)
+                self._writer.start()
+
+    def _write_results(self):
+        while True:
+            item = self._results.get()
+            if item is None:
+                return
+            sha256, res, rel_paths = item
+            for attempt in range(1, WRITE_ATTEMPTS + 1):
+                try:
+                    _record_processed(sha256, res, rel_paths)
+                    break
+                except Exception:
+                    if attempt == WRITE_ATTEMPTS:
+                        log.exception("recording processed image %s failed", sha256)
+                    else:
+                        time.sleep(attempt)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            # after the pool: every done-callback has queued its result by now
+            self._results.put(None)
+            writer.join()
+
+def _result_or_blank(fut: Future):
+    try:
+        return fut.result()
+    except Exception:
+        return {"width": 0, "height": 0}    # unreadable image: same as the old inline path
+
+def _record_processed(sha256: str, res, rel_paths):
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(Media)
+            .where(Media.sha256 == sha256, Media.width.is_(None))
+            .values(width=str(res["width"]), height=str(res["height"]), updated_at=now())
+        )
+        if res.get("phash"):
+            record_phash(db, sha256, res["phash"])
+        if res.get("renditions"):
+            db.execute(*rendition_upsert(sha256, res["renditions"], rel_paths))
+        if res.get("features"):
+            db.execute(feature_upsert(sha256, res["features"]))
+            vector_index.add_blob(db, sha256)
+        db.commit()
+    finally:
+        db.close()
+
+def record_phash(db, sha256: str, ph: str):
+    """Set phash on the rows of one blob that lack it and add them to the similarity index."""
+    db.execute(update(Media).where(Media.sha256 == sha256, Media.phash.is_(None)).values(phash=ph))
+    for (media_uuid,) in db.query(Media.media_uuid).filter(Media.sha256 == sha256, Media.deleted_at.is_(None)):
+        phash_index.add(media_uuid, ph)
+
+pipeline = ImagePipeline(settings.image_workers, settings.image_queue_size)
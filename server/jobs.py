@@ -0,0 +1,160 @@
+# server/jobs.py
+"""
+In-process background jobs for long imports. A small thread pool runs the
+work; a bounded number of jobs may be queued or running at once. Job
+functions report progress through Job.progress(), which is also where a
+requested cancellation takes effect.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from uuid import uuid4
+from datetime import datetime
+
+from .settings import settings
+
+now = lambda: datetime.utcnow().isoformat(timespec="seconds") + "Z"
+
+KEEP_FINISHED = 100  # finished jobs kept around for polling
+
+class JobQueueFull(Exception):
+    pass
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    def __init__(self, kind: str, params: Optional[Dict[str, Any]] = None,
+                 on_done: Optional[Callable[[], None]] = None):
+        self.job_id = f"j_{uuid4()}"
+        self.kind = kind
+        self.params = params or {}
+        self.status = "queued"          # queued | running | done | failed | cancelled
+        self.created_at = now()
+        self.rows_done = 0
+        self.rows_total: Optional[int] = None
+        self.fraction: Optional[float] = None   # 0..1 when the job knows it (bytes, files)
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._cancel = threading.Event()
+        self._future = None
+        self._on_done = on_done
+
+    def _cleanup(self):
+        """Run on_done once, whether the job finished, failed or was cancelled before it started."""
+        on_done, self._on_done = self._on_done, None
+        if on_done is not None:
+            on_done()
+
+    def progress(self, rows_done: int, rows_total: Optional[int] = None, fraction: Optional[float] = None):
+        """Called by the job function; raises JobCancelled once cancel() was requested."""
+        self.rows_done = rows_done
+        if rows_total is not None:
+            self.rows_total = rows_total
+        if fraction is not None:
+            self.fraction = min(max(fraction, 0.0), 1.0)
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = None
+        rate = None
+        eta = None
+        if self._started is not None:
+            elapsed = (self._finished or time.monotonic()) - self._started
+            if elapsed > 0:
+                rate = self.rows_done / elapsed
+            if self.status == "running":
+                if self.fraction:
+                    eta = elapsed * (1 - self.fraction) / self.fraction
+                elif self.rows_total and rate:
+                    eta = max(self.rows_total - self.rows_done, 0) / rate
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "rows_done": self.rows_done,
+            "rows_total": self.rows_total,
+            "fraction": self.fraction,
+            "elapsed_sec": round(elapsed, 1) if elapsed is not None else None,
+            "rows_per_sec": round(rate, 1) if rate is not None else None,
+            "eta_sec": round(eta, 1) if eta is not None else None,
+            "result": self.result,
+            "error": self.error,
+        }
+
+class JobRunner:
+    def __init__(self, workers: int, max_pending: int):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._max_pending = max_pending
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[[Job], Dict[str, Any]], params: Optional[Dict[str, Any]] = None,
+               on_done: Optional[Callable[[], None]] = None) -> Job:
+        """
+        Queue fn(job); raises JobQueueFull when max_pending jobs are already
+        queued/running. on_done (e.g. removing a spooled upload) runs exactly
+        once: after fn, on cancel before start, or right away if the queue is full.
+        """
+        job = Job(kind, params, on_done)
+        with self._lock:
+            active = sum(1 for j in self._jobs.values() if j.status in ("queued", "running"))
+            if active >= self._max_pending:
+                job._cleanup()
+                raise JobQueueFull()
+            self._jobs[job.job_id] = job
+            self._prune()
+        job._future = self._pool.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> list:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job._cancel.set()
+        if job._future is not None and job._future.cancel():
+            job.status = "cancelled"       # never started, so _run won't clean up
+            job._cleanup()
+        return job
+
+    def _run(self, job: Job, fn):
+        if job._cancel.is_set():
+            job.status = "cancelled"
+            job._cleanup()
+            return
+        job.status = "running"
+        job._started = time.monotonic()
+        try:
+            job.result = fn(job)
+            job.status = "done"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            job._finished = time.monotonic()
+            job._cleanup()
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond KEEP_FINISHED; caller holds self._lock."""
+        finished = [j for j in self._jobs.values() if j.status not in ("queued", "running")]
+        for j in sorted(finished, key=lambda j: j.created_at)[:-KEEP_FINISHED]:
+            self._jobs.pop(j.job_id, None)
+
+runner = JobRunner(settings.job_workers, settings.job_queue_size)
@@ -2,7 +2,6 @@
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
 from .settings import settings
 
@@ -16,20 +15,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-os.makedirs("media", exist_ok=True)
-app.mount("/media", StaticFiles(directory="media"), name="media")
-
 from .routers import cards
 from .routers import export as export_router
 from .routers import import_csv
 from .routers import ownership
 from .routers import media as media_router   # <-- import directly
+from .routers import jobs as jobs_router
+from .routers import identify as identify_router
+from .routers import portfolio as portfolio_router
+from .routers import prices as prices_router
 
 app.include_router(cards.router)
 app.include_router(export_router.router)
 app.include_router(import_csv.router)
 app.include_router(ownership.router)
 app.include_router(media_router.router)      # <-- include directly
+app.include_router(jobs_router.router)
+app.include_router(identify_router.router)
+app.include_router(portfolio_router.router)
+app.include_router(prices_router.router)
+
+os.makedirs("media", exist_ok=True)
+app.mount("/media", media_router.MediaFiles(directory="media"), name="media")
+
+@app.on_event("startup")
+def _load_media_indexes():
+    from .features import numpy_or_none, index as vector_index
+    from .phash import index as phash_index
+
+    phash_index.ensure_loaded()
+    if numpy_or_none() is not None:
+        vector_index.ensure_loaded()
+
+@app.on_event("shutdown")
+def _stop_image_pipeline():
+    from .images import pipeline
+    pipeline.shutdown()
 
 @app.get("/health")
 def health():
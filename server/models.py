@@ -1,5 +1,5 @@
 # server/models.py
-from sqlalchemy import Column, String, Integer, Text, DateTime, Numeric, ForeignKey, UniqueConstraint, Boolean, text
+from sqlalchemy import Column, String, Integer, Text, DateTime, Numeric, ForeignKey, UniqueConstraint, Boolean, Index, LargeBinary, Float, text
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from datetime import datetime
 from .db import Base
@@ -40,9 +40,21 @@ class Card(Base):
     canonical_key: Mapped[str | None] = mapped_column(String, index=True, nullable=True)
     created_by_user_id: Mapped[str | None] = mapped_column(String, nullable=True)
     updated_by_user_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    # cards_fts key, set by the cards_fts_ai trigger (the implicit rowid can change on VACUUM)
+    search_rowid: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     __table_args__ = (
         UniqueConstraint("tenant_id", "canonical_key", name="ux_cards_tenant_canonical"),
+        Index("ux_cards_search_rowid", "search_rowid", unique=True),
+        # list_cards: one live-row index per sort key, card_uuid as the keyset tie-break
+        *[
+            Index(f"ix_cards_live_{c}", c, "card_uuid", sqlite_where=text("deleted_at IS NULL"))
+            for c in ("updated_at", "created_at", "year", "player", "brand", "set_name", "card_no")
+        ],
+        # sport/year filter in the default updated_at order (sport matched case-insensitively via lower())
+        Index("ix_cards_live_sport_year", text("lower(sport)"), "year", "updated_at", sqlite_where=text("deleted_at IS NULL")),
+        # browse facets GROUP BY: covering
+        Index("ix_cards_live_browse", "sport", "year", "brand", "set_name", sqlite_where=text("deleted_at IS NULL")),
     )
 
 class Ownership(Base):
@@ -68,6 +80,13 @@ class Ownership(Base):
     status: Mapped[str | None] = mapped_column(String)           # OWNED | SOLD | TRADED
     notes: Mapped[str | None] = mapped_column(Text)
 
+    __table_args__ = (
+        # holdings of one card (card pages, ?card_uuid=)
+        Index("ix_ownership_card_live", "card_uuid", "deleted_at"),
+        # list_ownership: newest first, ownership_uuid as the keyset tie-break
+        Index("ix_ownership_live_updated_at", "updated_at", "ownership_uuid", sqlite_where=text("deleted_at IS NULL")),
+    )
+
 class Price(Base):
     __tablename__ = "prices"
     price_uuid: Mapped[str] = mapped_column(String, primary_key=True)
@@ -92,6 +111,32 @@ class Price(Base):
     confidence: Mapped[str | None] = mapped_column(String)           # HIGH|MEDIUM|LOW
     notes: Mapped[str | None] = mapped_column(Text)
 
+    __table_args__ = (
+        # per-card price history by date; the trailing columns make the bulk
+        # ingest duplicate check (card, sale_date, market, amount) index-only
+        Index("ix_prices_card_sale", "card_uuid", "sale_date", "source_market", "amount_all_in"),
+    )
+
+class PriceStat(Base):
+    """Per-card, per-grade sale statistics (server/price_stats.py), kept current by price ingestion."""
+    __tablename__ = "price_stats"
+    card_uuid: Mapped[str] = mapped_column(String, ForeignKey("cards.card_uuid"), primary_key=True)
+    grade_key: Mapped[str] = mapped_column(String, primary_key=True)   # RAW | PSA:10 | ...
+    updated_at: Mapped[str] = mapped_column(String, default=now_utc)
+
+    sales: Mapped[int] = mapped_column(Integer)
+    last_sale_date: Mapped[str] = mapped_column(String)
+    last_amount: Mapped[float] = mapped_column(Float)
+    median_30d: Mapped[float] = mapped_column(Float)   # sales within 30 days of last_sale_date
+    sales_30d: Mapped[int] = mapped_column(Integer)
+    min_amount: Mapped[float] = mapped_column(Float)
+    max_amount: Mapped[float] = mapped_column(Float)
+
+    __table_args__ = (
+        # list_cards sort=market_value: ordered walk within one grade bucket
+        Index("ix_price_stats_grade_median", "grade_key", "median_30d", "card_uuid"),
+    )
+
 class Media(Base):
     __tablename__ = "media"
     media_uuid: Mapped[str] = mapped_column(String, primary_key=True)
@@ -111,3 +156,45 @@ class Media(Base):
     height: Mapped[str | None] = mapped_column(String)
     filesize_bytes: Mapped[str | None] = mapped_column(String)
     notes: Mapped[str | None] = mapped_column(Text)
+
+    __table_args__ = (
+        # latest live front/back per card (media pair lookups)
+        Index("ix_media_card_kind_live", "card_uuid", "kind", "deleted_at", "created_at"),
+        # content-addressed blobs: dedupe lookups and blob refcounts
+        Index("ix_media_sha256", "sha256"),
+    )
+
+class MediaRendition(Base):
+    """Downscaled WebP/AVIF copy of a media blob (server/images.py), keyed by the blob's sha256."""
+    __tablename__ = "media_renditions"
+    sha256: Mapped[str] = mapped_column(String, primary_key=True)
+    size: Mapped[str] = mapped_column(String, primary_key=True)     # xs | sm | md | lg
+    format: Mapped[str] = mapped_column(String, primary_key=True)   # webp | avif
+    created_at: Mapped[str] = mapped_column(String, default=now_utc)
+
+    path: Mapped[str] = mapped_column(Text)      # relative to the media dir
+    width: Mapped[int] = mapped_column(Integer)
+    height: Mapped[int] = mapped_column(Integer)
+    bytes: Mapped[int] = mapped_column(Integer)
+
+class MediaFeature(Base):
+    """Image descriptor of a media blob (server/features.py) for scan-to-card matching."""
+    __tablename__ = "media_features"
+    sha256: Mapped[str] = mapped_column(String, primary_key=True)
+    created_at: Mapped[str] = mapped_column(String, default=now_utc)
+    version: Mapped[int] = mapped_column(Integer)
+    dims: Mapped[int] = mapped_column(Integer)
+    vector: Mapped[bytes] = mapped_column(LargeBinary)          # float16 x dims
+
+class ImportManifest(Base):
+    """One row per CardLists release file seen by scripts/import_cardlists.py --incremental."""
+    __tablename__ = "import_manifest"
+    path: Mapped[str] = mapped_column(String, primary_key=True)   # absolute path of the release JSON
+    created_at: Mapped[str] = mapped_column(String, default=now_utc)
+    updated_at: Mapped[str] = mapped_column(String, default=now_utc)
+
+    sport: Mapped[str | None] = mapped_column(String)
+    size_bytes: Mapped[int] = mapped_column(Integer)
+    mtime_ns: Mapped[int] = mapped_column(Integer)
+    sha256: Mapped[str] = mapped_column(String)
+    row_hashes_json: Mapped[str | None] = mapped_column(Text)      # {canonical_key: field hash}
@@ -0,0 +1,132 @@
+# server/phash.py
+"""
+Perceptual hashes for near-duplicate scans. phash() is the usual 64-bit DCT
+hash (32x32 grayscale, top-left 8x8 of the DCT against its median), stored
+as 16 hex chars in Media.phash. PhashIndex keeps every hashed live media row
+in a BK-tree over Hamming distance, so a radius search only visits the
+subtrees the triangle inequality allows instead of every pair.
+"""
+import math
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from PIL import Image
+
+from .db import SessionLocal
+from .models import Media
+
+HASH_SIZE = 8
+DCT_SIZE = 32
+# DCT-II basis rows for the low frequencies only; the rest are never used
+_COS = [[math.cos(math.pi * (2 * x + 1) * u / (2 * DCT_SIZE)) for x in range(DCT_SIZE)]
+        for u in range(HASH_SIZE)]
+
+def phash(im: Image.Image) -> str:
+    g = im.convert("L").resize((DCT_SIZE, DCT_SIZE), Image.LANCZOS)
+    px = list(g.getdata())
+    rows = [px[y * DCT_SIZE:(y + 1) * DCT_SIZE] for y in range(DCT_SIZE)]
+    # separable 2D DCT: rows first (DCT_SIZE x HASH_SIZE), then columns
+    r = [[sum(c * v for c, v in zip(_COS[u], row)) for u in range(HASH_SIZE)] for row in rows]
+    d = [sum(_COS[v][y] * r[y][u] for y in range(DCT_SIZE))
+         for v in range(HASH_SIZE) for u in range(HASH_SIZE)]
+    median = sorted(d[1:])[len(d[1:]) // 2]     # DC term excluded
+    bits = 0
+    for c in d:
+        bits = (bits << 1) | (c > median)
+    return f"{bits:0{HASH_SIZE * HASH_SIZE // 4}x}"
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+class BKTree:
+    """BK-tree of distinct 64-bit hashes; each node carries the items with that hash."""
+
+    def __init__(self):
+        self._root: Optional[list] = None     # [hash, items, {distance: child}]
+        self.size = 0
+
+    def add(self, h: int, item: str):
+        if self._root is None:
+            self._root = [h, {item}, {}]
+            self.size = 1
+            return
+        node = self._root
+        while True:
+            d = hamming(h, node[0])
+            if d == 0:
+                node[1].add(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, {item}, {}]
+                self.size += 1
+                return
+            node = child
+
+    def search(self, h: int, radius: int) -> List[Tuple[int, Set[str]]]:
+        """(distance, items) for every hash within radius of h."""
+        out = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= radius:
+                out.append((d, node[1]))
+            for cd, child in node[2].items():
+                if d - radius <= cd <= d + radius:
+                    stack.append(child)
+        return out
+
+class PhashIndex:
+    """
+    Process-wide index of media_uuid by phash. Loaded from the media table on
+    first use (or at startup) and fed by the upload pipeline afterwards. Rows
+    soft-deleted later stay in the tree; callers filter results against the DB.
+    """
+
+    def __init__(self):
+        self._tree = BKTree()
+        self._hashes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def add(self, media_uuid: str, phash_hex: str):
+        with self._lock:
+            self._add(media_uuid, phash_hex)
+
+    def _add(self, media_uuid: str, phash_hex: str):
+        h = int(phash_hex, 16)
+        if self._hashes.get(media_uuid) == h:
+            return
+        self._hashes[media_uuid] = h
+        self._tree.add(h, media_uuid)
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(Media.media_uuid, Media.phash)
+                .filter(Media.phash.isnot(None), Media.deleted_at.is_(None))
+                .all()
+            )
+        finally:
+            db.close()
+        with self._lock:
+            if not self._loaded:
+                for media_uuid, ph in rows:
+                    self._add(media_uuid, ph)
+                self._loaded = True
+
+    def similar(self, phash_hex: str, max_distance: int) -> List[Tuple[int, str]]:
+        """(distance, media_uuid) within max_distance, nearest first."""
+        self.ensure_loaded()
+        with self._lock:
+            found = self._tree.search(int(phash_hex, 16), max_distance)
+        return sorted((d, m) for d, items in found for m in items)
+
+    def stats(self) -> Dict[str, int]:
+        return {"media": len(self._hashes), "distinct_hashes": self._tree.size}
+
+index = PhashIndex()
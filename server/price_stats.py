@@ -0,0 +1,81 @@
+# server/price_stats.py
+"""
+Materialized sale statistics per (card, grade bucket) in price_stats: last
+sale, the median of the sales within WINDOW_DAYS of that last sale, min/max
+and counts. The window is anchored to the card's own last sale rather than
+today, so a row only changes when that card's sales change. Medians can't be
+maintained by deltas, so price ingestion recomputes the rows of just the
+cards it touched (refresh), inside its own transaction; refresh_all is the
+backfill for prices written any other way.
+"""
+import statistics
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import Float, cast, delete, insert, select
+
+from .models import Price, PriceStat
+from .valuation import grade_key, sold_prices
+
+WINDOW_DAYS = 30
+REFRESH_CHUNK = 500      # cards per read/replace round
+
+def normalize_grade(s: str) -> str:
+    """'psa: 10' -> 'PSA:10', '' or 'raw' -> 'RAW'; same rules as valuation.grade_key."""
+    scale, _, value = (s or "").partition(":")
+    scale = scale.strip().upper() or "RAW"
+    return "RAW" if scale == "RAW" else f"{scale}:{value.strip()}"
+
+def _stats(sales: List[Tuple[str, float]]) -> Dict[str, Any]:
+    """sales: (sale_date, amount), oldest first."""
+    last_date, last_amount = sales[-1]
+    start = (date.fromisoformat(last_date[:10]) - timedelta(days=WINDOW_DAYS)).isoformat()
+    window = [a for d, a in sales if d[:10] > start]
+    amounts = [a for _, a in sales]
+    return {
+        "sales": len(sales),
+        "last_sale_date": last_date,
+        "last_amount": last_amount,
+        "median_30d": round(statistics.median(window), 2),
+        "sales_30d": len(window),
+        "min_amount": min(amounts),
+        "max_amount": max(amounts),
+    }
+
+def refresh(db, card_uuids: Iterable[str]) -> int:
+    """Recompute price_stats for these cards (every grade) in the caller's transaction; returns rows written."""
+    ids = list(set(card_uuids))
+    ts = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    written = 0
+    for i in range(0, len(ids), REFRESH_CHUNK):
+        chunk = ids[i:i + REFRESH_CHUNK]
+        groups: Dict[Tuple[str, str], List[Tuple[str, float]]] = defaultdict(list)
+        rows = db.execute(
+            select(Price.card_uuid, grade_key(Price), Price.sale_date, cast(Price.amount_all_in, Float))
+            .where(Price.card_uuid.in_(chunk), Price.sale_date.isnot(None), sold_prices())
+            .order_by(Price.card_uuid, Price.sale_date)
+        )
+        for card_uuid, grade, sale_date, amount in rows:
+            groups[(card_uuid, grade)].append((sale_date, amount))
+        db.execute(delete(PriceStat).where(PriceStat.card_uuid.in_(chunk)))
+        if groups:
+            db.execute(insert(PriceStat.__table__), [
+                {"card_uuid": c, "grade_key": g, "updated_at": ts, **_stats(sales)}
+                for (c, g), sales in groups.items()
+            ])
+        written += len(groups)
+    return written
+
+def refresh_all(db, progress=None) -> Dict[str, int]:
+    """Rebuild price_stats for every priced card, committing per chunk."""
+    db.execute(delete(PriceStat).where(PriceStat.card_uuid.notin_(select(Price.card_uuid))))
+    db.commit()
+    cards = db.execute(select(Price.card_uuid).distinct()).scalars().all()
+    written = 0
+    for i in range(0, len(cards), REFRESH_CHUNK):
+        written += refresh(db, cards[i:i + REFRESH_CHUNK])
+        db.commit()
+        if progress:
+            progress(min(i + REFRESH_CHUNK, len(cards)), len(cards))
+    return {"cards": len(cards), "rows": written}
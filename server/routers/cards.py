@@ -1,15 +1,25 @@
 # server/routers/cards.py
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
-from typing import List, Optional
+from sqlalchemy import or_, and_, select, update, func, table, column, literal_column, null
+from typing import Dict, List, Optional, Tuple
 from uuid import uuid4
 from datetime import datetime
+import base64
+import json
 import re
+import time
 
-from ..deps import get_db
-from ..models import Card
-from ..schemas import CardCreate, CardUpdate, CardOut
+from starlette.concurrency import run_in_threadpool
+
+from ..deps import get_db, get_async_db
+from ..facets import FacetKey, browse_facets, facet_key
+from ..models import Card, PriceStat
+from ..price_stats import normalize_grade
+from ..schemas import CardCreate, CardUpdate, CardOut, CardsBulkRequest, PriceStatsOut, WishlistBulkRequest
+from ..valuation import portfolio
+from .media import latest_pairs
 
 router = APIRouter(prefix="/v1/cards", tags=["cards"])
 
@@ -22,30 +32,53 @@ def canon(year, brand, set_name, subset, card_no, parallel, variant) -> str:
                      to_s(subset), to_s(card_no), to_s(parallel), to_s(variant)])
 
 # ---------- POWERED SEARCH (order-agnostic, multi-attribute) ----------
+# Columns indexed by the cards_fts virtual table (see the fts5 migration).
+FTS_COLUMNS = [
+    "player", "brand", "set_name", "subset", "card_no",
+    "team", "sport", "parallel", "variant", "notes",
+]
+FTS_MIN_TOKEN = 3  # trigram tokenizer can't match anything shorter
+NO_RANK = 1e300    # relevance for rows the index didn't score; sorts after every bm25 value
+
+_fts = table("cards_fts", column("rowid"))   # cards_fts.rowid is cards.search_rowid
+
+def _search_tokens(q: Optional[str]) -> List[str]:
+    # tokens: words/numbers only, lowercased
+    return re.findall(r"[A-Za-z0-9]+", q.lower()) if q else []
+
+def _fts_match(expr: str):
+    return select(_fts.c.rowid).where(literal_column("cards_fts").op("MATCH")(expr))
+
 def apply_tokenized_search(query, q: str):
     """
     Split q into tokens and AND them together; for each token, OR across
     the relevant text columns. If the token is all digits, additionally
     match Card.year == int(token).
-    """
-    if not q:
-        return query
 
-    # tokens: words/numbers only, lowercased
-    tokens = re.findall(r"[A-Za-z0-9]+", q.lower())
+    Tokens of 3+ chars are answered by the cards_fts trigram index (substring
+    match, same hits as ILIKE '%tok%'); shorter ones fall back to ILIKE on the
+    rows the index already narrowed down.
+    """
+    tokens = _search_tokens(q)
     if not tokens:
         return query
 
-    # Columns to OR together for each token
-    cols = [
-        Card.player, Card.brand, Card.set_name, Card.subset,
-        Card.card_no, Card.team, Card.sport, Card.parallel, Card.variant,
-        Card.notes,
-    ]
+    # word tokens go to the index as a single AND expression
+    phrases = [f'"{t}"' for t in tokens if len(t) >= FTS_MIN_TOKEN and not t.isdigit()]
+    if phrases:
+        query = query.filter(Card.search_rowid.in_(_fts_match(" AND ".join(phrases))))
+
+    # Columns to OR together for short tokens
+    cols = [getattr(Card, c) for c in FTS_COLUMNS]
 
     for t in tokens:
-        like = f"%{t}%"
-        disj = or_(*[c.ilike(like) for c in cols])
+        if len(t) >= FTS_MIN_TOKEN and not t.isdigit():
+            continue
+        if len(t) >= FTS_MIN_TOKEN:
+            disj = Card.search_rowid.in_(_fts_match(f'"{t}"'))
+        else:
+            like = f"%{t}%"
+            disj = or_(*[c.ilike(like) for c in cols])
         if t.isdigit():
             try:
                 disj = or_(disj, Card.year == int(t))
@@ -55,41 +88,292 @@ def apply_tokenized_search(query, q: str):
 
     return query
 
+def relevance_rank(query, q: str):
+    """
+    Join bm25 over the search tokens and return (query, rank_expr); lower is
+    better, rows matched only through the year rule rank last. rank_expr is
+    None when no token is long enough for the index.
+    """
+    phrases = [f'"{t}"' for t in _search_tokens(q) if len(t) >= FTS_MIN_TOKEN]
+    if not phrases:
+        return query, None
+
+    ranked = (
+        select(_fts.c.rowid.label("rowid"), func.bm25(literal_column("cards_fts")).label("rank"))
+        .where(literal_column("cards_fts").op("MATCH")(" OR ".join(phrases)))
+        .subquery()
+    )
+    query = query.outerjoin(ranked, ranked.c.rowid == Card.search_rowid)
+    return query, func.coalesce(ranked.c.rank, NO_RANK)
+
+def filter_cards(query, q: Optional[str] = None, sport: Optional[str] = None,
+                 year: Optional[int] = None, wishlisted: Optional[bool] = None):
+    """Live-card filters shared by list_cards and the exports (Query or select())."""
+    query = query.filter(Card.deleted_at.is_(None))
+
+    if wishlisted is not None:
+        query = query.filter(Card.wishlisted == wishlisted)
+    if sport:
+        if "%" in sport or "_" in sport:
+            query = query.filter(Card.sport.ilike(sport))
+        else:
+            # same match as ILIKE without wildcards, but can use ix_cards_live_sport_year
+            query = query.filter(func.lower(Card.sport) == func.lower(sport))
+    if year is not None:
+        query = query.filter(Card.year == year)
+
+    if q:
+        query = apply_tokenized_search(query, q)
+
+    return query
+
+# ---------- PAGING & TOTALS ----------
+SORT_COLUMNS = {
+    "updated_at": Card.updated_at,
+    "created_at": Card.created_at,
+    "year": Card.year,
+    "player": Card.player,
+    "brand": Card.brand,
+    "set_name": Card.set_name,
+    "card_no": Card.card_no,
+    "market_value": PriceStat.median_30d,   # paged by _market_value_rows; unpriced cards come last
+}
+COUNT_CACHE_TTL = 60         # seconds; bounds staleness from out-of-process writers (import script)
+COUNT_ESTIMATE_CAP = 10_000  # total=estimate stops counting here
+
+_count_cache: Dict[tuple, Tuple[float, int]] = {}
+
+def invalidate_card_counts() -> None:
+    """Drop cached list_cards totals, browse facets and the portfolio summary. Call after bulk writes to cards."""
+    _count_cache.clear()
+    browse_facets.invalidate()
+    portfolio.invalidate()
+
+def _card_changed(before: Optional[FacetKey] = None, after: Optional[FacetKey] = None) -> None:
+    """Single-card write: drop cached totals, move the card between browse facets."""
+    _count_cache.clear()
+    browse_facets.apply(before, after)
+    if before is not None and before != after:
+        portfolio.invalidate()     # holdings may have moved group or lost their card
+
+def _encode_cursor(sort: str, order: str, value, card_uuid: str) -> str:
+    raw = json.dumps([sort, order, value, card_uuid], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(token: str, sort: str, order: str):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        c_sort, c_order, value, card_uuid = json.loads(raw)
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+    if (c_sort, c_order) != (sort, order) or not isinstance(card_uuid, str):
+        raise HTTPException(400, "Cursor does not match sort/order")
+    return value, card_uuid
+
+def _keyset_after(col, value, card_uuid: str, desc: bool, uuid_col=Card.card_uuid):
+    """Rows strictly after (value, card_uuid) in (col, card_uuid) order; SQLite puts NULLs first."""
+    tie = uuid_col < card_uuid if desc else uuid_col > card_uuid
+    if value is None:
+        cond = and_(col.is_(None), tie)
+        return cond if desc else or_(cond, col.isnot(None))
+    beyond = col < value if desc else col > value
+    cond = or_(beyond, and_(col == value, tie))
+    return or_(cond, col.is_(None)) if desc else cond
+
+async def _count_total(db: AsyncSession, filtered, signature: tuple, mode: str) -> Tuple[Optional[int], bool]:
+    """Returns (total, is_estimate) for total=exact|estimate|none."""
+    if mode == "none":
+        return None, False
+
+    hit = _count_cache.get(signature)
+    if hit and time.monotonic() - hit[0] < COUNT_CACHE_TTL:
+        return hit[1], False
+
+    if mode == "estimate":
+        capped = filtered.with_only_columns(Card.card_uuid).limit(COUNT_ESTIMATE_CAP + 1).subquery()
+        n = (await db.execute(select(func.count()).select_from(capped))).scalar_one()
+        if n > COUNT_ESTIMATE_CAP:
+            return COUNT_ESTIMATE_CAP, True
+    else:
+        n = (await db.execute(select(func.count()).select_from(filtered.subquery()))).scalar_one()
+    _count_cache[signature] = (time.monotonic(), n)
+    return n, False
+
 # ---------- CRUD & LIST ----------
+async def _market_value_rows(db: AsyncSession, filtered, grade: str, desc: bool,
+                             cursor: Optional[tuple], offset: int, limit: int) -> list:
+    """
+    sort=market_value rows as (card, median_30d, stat): cards priced in grade,
+    in ix_price_stats_grade_median order, then the unpriced ones by card_uuid,
+    so every filter returns the same cards as any other sort. Two index-ordered
+    queries rather than one outer join, which would sort every live card per
+    page. A cursor with a null value points into the unpriced part.
+    """
+    direction = (lambda c: c.desc()) if desc else (lambda c: c.asc())
+    median = PriceStat.median_30d
+    priced = filtered.join(PriceStat, and_(PriceStat.card_uuid == Card.card_uuid, PriceStat.grade_key == grade))
+    rows = []
+    if cursor is None or cursor[0] is not None:
+        # PriceStat.card_uuid as the tie-break lets the index supply the whole order
+        query = priced.add_columns(median, PriceStat).order_by(direction(median), direction(PriceStat.card_uuid))
+        if cursor is not None:
+            query = query.filter(_keyset_after(median, *cursor, desc, PriceStat.card_uuid))
+        else:
+            query = query.offset(offset)
+        rows = (await db.execute(query.limit(limit))).all()
+        if len(rows) == limit:
+            return rows
+        if cursor is None and offset and not rows:
+            # the page starts somewhere past the priced cards
+            n_priced = (await db.execute(
+                select(func.count()).select_from(priced.with_only_columns(Card.card_uuid).subquery())
+            )).scalar_one()
+            offset = max(offset - n_priced, 0)
+        else:
+            offset = 0
+        cursor = None
+
+    unpriced = filtered.where(~select(PriceStat.card_uuid).where(
+        PriceStat.card_uuid == Card.card_uuid, PriceStat.grade_key == grade).exists())
+    query = unpriced.add_columns(null(), null()).order_by(direction(Card.card_uuid))
+    if cursor is not None:
+        query = query.filter(Card.card_uuid < cursor[1] if desc else Card.card_uuid > cursor[1])
+    else:
+        query = query.offset(offset)
+    return rows + (await db.execute(query.limit(limit - len(rows)))).all()
+
 @router.get("")  # returning dict -> don't force response_model
-def list_cards(
-    db: Session = Depends(get_db),
+async def list_cards(
+    db: AsyncSession = Depends(get_async_db),
     q: Optional[str] = Query(None),
     page: int = 1,
     page_size: int = 50,
-    sort: str = "updated_at",   # updated_at, created_at, year, player, brand, set_name, card_no
+    sort: str = Query("updated_at", description="updated_at, created_at, year, player, brand, set_name, card_no, "
+                      "relevance, or market_value (30-day median in `grade`; cards without sales in that grade "
+                      "are kept and come last in either order)"),
     order: str = "desc",        # asc|desc
     wishlisted: Optional[bool] = Query(None),
+    sport: Optional[str] = Query(None),
+    year: Optional[int] = Query(None),
+    after: Optional[str] = Query(None, description="Opaque cursor from next_after; replaces page"),
+    total: str = Query("exact", pattern="^(exact|estimate|none)$"),
+    media: bool = Query(False, description="Embed latest front/back per card under 'media'"),
+    prices: bool = Query(False, description="Fill each item's 'price' from price_stats"),
+    grade: str = Query("RAW", description="Grade bucket for price and sort=market_value, e.g. RAW or PSA:10"),
 ):
     page = max(1, page)
     page_size = min(max(1, page_size), 200)
+    order = "asc" if order.lower() == "asc" else "desc"
+    grade = normalize_grade(grade)
+    by_value = sort == "market_value"
+    stats_join = and_(PriceStat.card_uuid == Card.card_uuid, PriceStat.grade_key == grade)
 
-    query = db.query(Card).filter(Card.deleted_at.is_(None))
-
-    if wishlisted is not None:
-        query = query.filter(Card.wishlisted == wishlisted)
+    query = filter_cards(select(Card), q=q, sport=sport, year=year, wishlisted=wishlisted)
+    filtered = query
+    signature = (tuple(_search_tokens(q)), wishlisted, (sport or "").lower(), year)
 
-    if q:
-        query = apply_tokenized_search(query, q)
+    # Sorting: (sort key, card_uuid) so every key has a stable keyset
+    sort_col = None
+    if sort == "relevance" and q:
+        query, sort_col = relevance_rank(query, q)
+        if sort_col is not None:
+            order = "asc"
+        else:
+            # no token long enough to rank: default updated_at desc
+            order = "desc"
+    if sort_col is None:
+        sort = sort if sort in SORT_COLUMNS else "updated_at"
+        sort_col = SORT_COLUMNS[sort]
+    desc = order == "desc"
+    cursor = _decode_cursor(after, sort, order) if after else None
+    offset = (page - 1) * page_size
+    with_stats = prices or by_value
 
-    # Sorting
-    sort_col = getattr(Card, sort, Card.updated_at)
-    if order.lower() == "asc":
-        query = query.order_by(sort_col.asc())
+    # one extra row tells us whether there is a next page
+    if by_value:
+        rows = await _market_value_rows(db, filtered, grade, desc, cursor, offset, page_size + 1)
     else:
-        query = query.order_by(sort_col.desc())
+        query = query.order_by(
+            sort_col.desc() if desc else sort_col.asc(),
+            Card.card_uuid.desc() if desc else Card.card_uuid.asc(),
+        )
+        if cursor is not None:
+            query = query.filter(_keyset_after(sort_col, *cursor, desc))
+        else:
+            query = query.offset(offset)
+        if prices:
+            query = query.outerjoin(PriceStat, stats_join).add_columns(sort_col, PriceStat)
+        else:
+            query = query.add_columns(sort_col, null())
+        rows = (await db.execute(query.limit(page_size + 1))).all()
+    next_after = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last, last_key, _ = rows[-1]
+        next_after = _encode_cursor(sort, order, last_key, last.card_uuid)
 
-    total = query.count()
-    rows = query.offset((page - 1) * page_size).limit(page_size).all()
+    count, is_estimate = await _count_total(db, filtered, signature, total)
 
     # Let FastAPI serialize via Pydantic models
-    items = [CardOut.model_validate(r, from_attributes=True) for r in rows]
-    return {"items": items, "total": total}
+    items = []
+    for card, _, stat in rows:
+        item = CardOut.model_validate(card, from_attributes=True)
+        if with_stats and stat is not None:
+            item.price = PriceStatsOut.model_validate(stat, from_attributes=True)
+        items.append(item)
+    out = {"items": items, "total": count, "total_is_estimate": is_estimate, "next_after": next_after}
+    if media:
+        out["media"] = await latest_pairs(db, [c.card_uuid for c in items])
+    return out
+
+# ---------- BULK (declared before /{card_uuid} routes) ----------
+MAX_BULK_ITEMS = 5000   # per request; keeps each IN (...) under SQLite's bind limit
+
+def _check_bulk_size(n: int) -> None:
+    if n > MAX_BULK_ITEMS:
+        raise HTTPException(400, f"At most {MAX_BULK_ITEMS} items per request")
+
+def _bulk_results(card_uuids: List[str], found: set) -> List[Dict[str, object]]:
+    """Per-item outcome in request order."""
+    return [
+        {"card_uuid": u, "ok": True} if u in found else {"card_uuid": u, "ok": False, "error": "card not found"}
+        for u in card_uuids
+    ]
+
+@router.post("/bulk/wishlist")
+def bulk_wishlist(payload: WishlistBulkRequest, db: Session = Depends(get_db)):
+    """Set wishlisted on many cards with one UPDATE in one transaction."""
+    _check_bulk_size(len(payload.card_uuids))
+    found = set(db.execute(
+        select(Card.card_uuid).where(Card.card_uuid.in_(set(payload.card_uuids)), Card.deleted_at.is_(None))
+    ).scalars())
+    if found:
+        db.execute(
+            update(Card).where(Card.card_uuid.in_(found)).values(wishlisted=payload.wishlisted, updated_at=now()),
+            execution_options={"synchronize_session": False},
+        )
+    db.commit()
+    _card_changed()
+    return {"ok": True, "updated": len(found), "results": _bulk_results(payload.card_uuids, found)}
+
+@router.post("/bulk/delete")
+def bulk_delete(payload: CardsBulkRequest, db: Session = Depends(get_db)):
+    """Soft-delete many cards with one UPDATE in one transaction."""
+    _check_bulk_size(len(payload.card_uuids))
+    rows = db.execute(
+        select(Card.card_uuid, Card.sport, Card.year, Card.brand, Card.set_name)
+        .where(Card.card_uuid.in_(set(payload.card_uuids)), Card.deleted_at.is_(None))
+    ).all()
+    found = {r[0] for r in rows}
+    if found:
+        db.execute(
+            update(Card).where(Card.card_uuid.in_(found)).values(deleted_at=now()),
+            execution_options={"synchronize_session": False},
+        )
+    db.commit()
+    for card_uuid, *key in rows:
+        _card_changed(before=tuple(key))
+    return {"ok": True, "deleted": len(found), "results": _bulk_results(payload.card_uuids, found)}
 
 @router.get("/{card_uuid}", response_model=CardOut)
 def get_card(card_uuid: str, db: Session = Depends(get_db)):
@@ -112,6 +396,7 @@ def create_card(payload: CardCreate, db: Session = Depends(get_db)):
     card.canonical_key = canon(card.year, card.brand, card.set_name, card.subset,
                                card.card_no, card.parallel, card.variant)
     db.add(card); db.commit(); db.refresh(card)
+    _card_changed(after=facet_key(card))
     return card
 
 @router.patch("/{card_uuid}", response_model=CardOut)
@@ -119,12 +404,14 @@ def update_card(card_uuid: str, payload: CardUpdate, db: Session = Depends(get_d
     card = db.query(Card).filter(Card.card_uuid == card_uuid, Card.deleted_at.is_(None)).first()
     if not card:
         raise HTTPException(404, "Card not found")
+    before = facet_key(card)
     for k, v in payload.model_dump(exclude_unset=True).items():
         setattr(card, k, v)
     card.updated_at = now()
     card.canonical_key = canon(card.year, card.brand, card.set_name, card.subset,
                                card.card_no, card.parallel, card.variant)
     db.add(card); db.commit(); db.refresh(card)
+    _card_changed(before, facet_key(card))
     return card
 
 @router.delete("/{card_uuid}")
@@ -134,6 +421,7 @@ def delete_card(card_uuid: str, db: Session = Depends(get_db)):
         raise HTTPException(404, "Card not found")
     card.deleted_at = now()
     db.add(card); db.commit()
+    _card_changed(before=facet_key(card))
     return {"ok": True}
 
 @router.post("/{card_uuid}/wishlist")
@@ -149,81 +437,22 @@ def set_wishlist(
     card.updated_at = now()
     db.commit()
     db.refresh(card)
+    _card_changed()
     return {"ok": True, "card_uuid": card.card_uuid, "wishlisted": card.wishlisted}
 
 # ---------- BROWSE HELPERS (used by your UI) ----------
 @router.get("/browse/sports")
-def browse_sports(db: Session = Depends(get_db)):
-    rows = db.query(Card.sport).filter(
-        Card.deleted_at.is_(None),
-        Card.sport.isnot(None),
-        Card.sport != "",
-    ).distinct().all()
-    sports = sorted({(r[0] or "").strip() for r in rows if (r[0] or "").strip()})
-    return {"sports": sports}
+async def browse_sports():
+    rows = await run_in_threadpool(browse_facets.sports)
+    return {"sports": [label for label, _ in rows], "counts": dict(rows)}
 
 @router.get("/browse/years")
-def browse_years(
-    sport: str = Query(...),
-    db: Session = Depends(get_db),
-):
-    q = db.query(Card.year).filter(
-        Card.deleted_at.is_(None),
-        Card.sport.ilike(sport),
-        Card.year.isnot(None),
-    ).distinct()
-    years = sorted({r[0] for r in q.all() if r[0] is not None}, reverse=True)
-    return {"years": years}
+async def browse_years(sport: str = Query(...)):
+    rows = await run_in_threadpool(browse_facets.years, sport)
+    return {"years": [y for y, _ in rows], "counts": dict(rows)}
 
 @router.get("/browse/products")
-def browse_products(
-    sport: str = Query(...),
-    year: int = Query(...),
-    db: Session = Depends(get_db),
-):
-    # brand + set_name pairs for the selected sport/year
-    q = db.query(Card.brand, Card.set_name).filter(
-        Card.deleted_at.is_(None),
-        Card.sport.ilike(sport),
-        Card.year == year,
-    ).distinct()
-
-    import re
-
-    def norm(s: Optional[str]) -> str:
-        if not s:
-            return ""
-        # collapse whitespace and trim
-        return re.sub(r"\s+", " ", s).strip()
-
-    labels: list[str] = []
-    for brand, set_name in q.all():
-        b = norm(brand)
-        s = norm(set_name)
-
-        if b and s:
-            # If set_name already contains brand (anywhere, case-insensitive),
-            # don’t duplicate the brand in the label.
-            if s.lower().startswith(b.lower()) or b.lower() in s.lower():
-                label = s
-            else:
-                label = f"{b} {s}"
-        elif s:
-            label = s
-        elif b:
-            label = b
-        else:
-            continue
-
-        labels.append(label)
-
-    # De-dupe case-insensitively while preserving original casing/order
-    seen_lower = set()
-    out: list[str] = []
-    for L in labels:
-        key = L.lower()
-        if key not in seen_lower:
-            seen_lower.add(key)
-            out.append(L)
-
-    return {"products": out}
+async def browse_products(sport: str = Query(...), year: int = Query(...)):
+    # brand + set_name labels for the selected sport/year, with card counts
+    rows = await run_in_threadpool(browse_facets.products, sport, year)
+    return {"products": [{"label": label, "count": n} for label, n in rows]}
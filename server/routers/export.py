@@ -1,24 +1,230 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select, Boolean, Integer, Numeric
+from decimal import Decimal
 from io import StringIO
+from typing import Iterator, Optional
 import csv
+import json
+import zlib
 
-from ..deps import get_db
-from ..models import Card
+from ..db import SessionLocal
+from ..models import Card, Ownership, Price
+from .cards import filter_cards
 
 router = APIRouter(prefix="/v1/export", tags=["export"])
 
+CSV_COLUMNS = ["card_uuid","year","brand","set_name","subset","card_no","player","team","sport",
+               "parallel","variant","print_run","notes","canonical_key","created_at","updated_at"]
+BATCH_ROWS = 1000  # rows fetched per cursor batch and encoded per response chunk
+
+def _csv_chunks(q, sport, year, wishlisted) -> Iterator[bytes]:
+    # own session: the generator outlives the request handler
+    db = SessionLocal()
+    try:
+        stmt = filter_cards(select(*[getattr(Card, c) for c in CSV_COLUMNS]),
+                            q=q, sport=sport, year=year, wishlisted=wishlisted)
+        stmt = stmt.order_by(Card.created_at.asc()).execution_options(yield_per=BATCH_ROWS)
+
+        buf = StringIO()
+        w = csv.writer(buf)
+        w.writerow(CSV_COLUMNS)
+        for i, row in enumerate(db.execute(stmt), 1):
+            w.writerow(row)
+            if i % BATCH_ROWS == 0:
+                yield buf.getvalue().encode("utf-8")
+                buf.seek(0); buf.truncate()
+        yield buf.getvalue().encode("utf-8")
+    finally:
+        db.close()
+
+def _gzip_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
 @router.get("/cards.csv")
-def export_cards(db: Session = Depends(get_db)):
-    rows = db.query(Card).filter(Card.deleted_at.is_(None)).order_by(Card.created_at.asc()).all()
-    buf = StringIO()
-    w = csv.writer(buf)
-    w.writerow(["card_uuid","year","brand","set_name","subset","card_no","player","team","sport",
-                "parallel","variant","print_run","notes","canonical_key","created_at","updated_at"])
-    for c in rows:
-        w.writerow([c.card_uuid,c.year,c.brand,c.set_name,c.subset,c.card_no,c.player,c.team,c.sport,
-                    c.parallel,c.variant,c.print_run,c.notes,c.canonical_key,c.created_at,c.updated_at])
-    buf.seek(0)
-    return StreamingResponse(iter([buf.getvalue()]), media_type="text/csv",
+def export_cards(
+    q: Optional[str] = Query(None),
+    sport: Optional[str] = Query(None),
+    year: Optional[int] = Query(None),
+    wishlisted: Optional[bool] = Query(None),
+    gzip: bool = Query(False, description="Return cards.csv.gz"),
+):
+    chunks = _csv_chunks(q, sport, year, wishlisted)
+    if gzip:
+        return StreamingResponse(_gzip_chunks(chunks), media_type="application/gzip",
+                                 headers={"Content-Disposition": 'attachment; filename="cards.csv.gz"'})
+    return StreamingResponse(chunks, media_type="text/csv",
                              headers={"Content-Disposition": 'attachment; filename="cards.csv"'})
+
+
+# ---------- typed exports: NDJSON / Arrow IPC / Parquet ----------
+EXPORT_TABLES = {"cards": Card, "ownership": Ownership, "prices": Price}
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+INT_TEXT_COLUMNS = {"print_run"}   # stored as text, exported as int64 (non-numeric -> null)
+JSON_COLUMNS = {"attributes_json", "variations_json", "parallels_json"}  # decoded in NDJSON
+INTERNAL_COLUMNS = {"search_rowid"}  # FTS key, renumbered on index rebuilds; not part of the export format
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain()."""
+    closed = False
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._pos = 0
+
+    def write(self, b) -> int:
+        b = bytes(b)
+        self._parts.append(b)
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        out, self._parts = b"".join(self._parts), []
+        return out
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise HTTPException(501, "Arrow/Parquet export needs pyarrow (pip install pyarrow)")
+    return pyarrow
+
+def _to_int(v):
+    try:
+        return None if v is None else int(v)
+    except (TypeError, ValueError):
+        return None
+
+def _arrow_schema(pa, cols):
+    fields = []
+    for c in cols:
+        if c.name in INT_TEXT_COLUMNS or isinstance(c.type, Integer):
+            t = pa.int64()
+        elif isinstance(c.type, Boolean):
+            t = pa.bool_()
+        elif isinstance(c.type, Numeric):
+            t = pa.decimal128(c.type.precision or 38, c.type.scale or 0)
+        else:
+            t = pa.string()
+        fields.append(pa.field(c.name, t))
+    return pa.schema(fields)
+
+def _export_columns(model) -> list:
+    return [c for c in model.__table__.columns if c.name not in INTERNAL_COLUMNS]
+
+def _row_batches(model, cols, q, sport, year, wishlisted) -> Iterator[list]:
+    """Live rows of model in BATCH_ROWS lists, on a session owned by the generator."""
+    db = SessionLocal()
+    try:
+        stmt = select(*cols)
+        if model is Card:
+            stmt = filter_cards(stmt, q=q, sport=sport, year=year, wishlisted=wishlisted)
+        else:
+            stmt = stmt.where(model.deleted_at.is_(None))
+        stmt = stmt.order_by(model.created_at.asc()).execution_options(yield_per=BATCH_ROWS)
+        for batch in db.execute(stmt).partitions():
+            yield batch
+    finally:
+        db.close()
+
+def _ndjson_chunks(cols, batches) -> Iterator[bytes]:
+    def value(name, v):
+        if v is None:
+            return None
+        if name in INT_TEXT_COLUMNS:
+            return _to_int(v)
+        if name in JSON_COLUMNS:
+            try:
+                return json.loads(v)
+            except ValueError:
+                return v
+        if isinstance(v, Decimal):
+            return float(v)
+        return v
+
+    names = [c.name for c in cols]
+    for batch in batches:
+        lines = [json.dumps({n: value(n, v) for n, v in zip(names, row)}, separators=(",", ":"))
+                 for row in batch]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+def _arrow_columns(schema, batch) -> dict:
+    out = {}
+    for i, field in enumerate(schema):
+        vals = [row[i] for row in batch]
+        if field.name in INT_TEXT_COLUMNS:
+            vals = [_to_int(v) for v in vals]
+        elif str(field.type) == "string":
+            vals = [None if v is None else str(v) for v in vals]
+        out[field.name] = vals
+    return out
+
+def _arrow_chunks(pa, cols, batches, fmt: str) -> Iterator[bytes]:
+    schema = _arrow_schema(pa, cols)
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pa.parquet.ParquetWriter(sink, schema, compression="zstd")  # one row group per batch
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    try:
+        for batch in batches:
+            writer.write_batch(pa.RecordBatch.from_pydict(_arrow_columns(schema, batch), schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+@router.get("/{table}.{fmt}")
+def export_table(
+    table: str,
+    fmt: str,
+    q: Optional[str] = Query(None, description="cards only"),
+    sport: Optional[str] = Query(None, description="cards only"),
+    year: Optional[int] = Query(None, description="cards only"),
+    wishlisted: Optional[bool] = Query(None, description="cards only"),
+    gzip: bool = Query(False, description="gzip the NDJSON stream"),
+):
+    """
+    Typed export of cards / ownership / prices as ndjson, arrow (IPC stream)
+    or parquet, written batch by batch. Arrow and Parquet need pyarrow.
+    """
+    model = EXPORT_TABLES.get(table)
+    if model is None or fmt not in EXPORT_FORMATS:
+        raise HTTPException(404, f"Unknown export {table}.{fmt}")
+    media_type, ext = EXPORT_FORMATS[fmt]
+    cols = _export_columns(model)
+    batches = _row_batches(model, cols, q, sport, year, wishlisted)
+
+    filename = f"{table}.{ext}"
+    if fmt == "ndjson":
+        chunks = _ndjson_chunks(cols, batches)
+        if gzip:
+            chunks, media_type, filename = _gzip_chunks(chunks), "application/gzip", filename + ".gz"
+    else:
+        chunks = _arrow_chunks(_require_pyarrow(), cols, batches, fmt)
+
+    return StreamingResponse(chunks, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
@@ -0,0 +1,168 @@
+# server/routers/identify.py
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, List
+
+import asyncio
+import os
+import shutil
+import tempfile
+
+from ..db import SessionLocal
+from ..deps import get_db
+from ..features import describe_file, describe_upload, feature_upsert, numpy_or_none, index as vector_index, VERSION
+from ..images import pipeline
+from ..jobs import Job
+from ..models import Card, Media, MediaFeature
+from ..schemas import CardOut
+from .jobs import submit_or_429
+from .media import MEDIA_DIR, MAX_SIZE, _thumb_url
+
+router = APIRouter(prefix="/v1/media", tags=["media"])
+
+CANDIDATES_PER_RESULT = 8      # nearest media vectors fetched per requested card
+MAX_IDENTIFY_BATCH = 500       # images per batch job
+PIPELINE_ROUND = 64            # images handed to the image pipeline at once by the jobs
+
+def _require_numpy():
+    np = numpy_or_none()
+    if np is None:
+        raise HTTPException(501, "Image matching needs numpy (pip install numpy)")
+    return np
+
+def _rank_cards(db: Session, vector: bytes, k: int) -> List[Dict[str, Any]]:
+    """Top-k live cards for a descriptor, best matching scan per card."""
+    np = _require_numpy()
+    query = np.frombuffer(vector, dtype=np.float16).astype(np.float32)
+    hits = vector_index.search(query, k * CANDIDATES_PER_RESULT)
+    if not hits:
+        return []
+
+    live_media = {
+        m.media_uuid: m
+        for m in db.query(Media).filter(Media.media_uuid.in_([h[1] for h in hits]), Media.deleted_at.is_(None))
+    }
+    best: Dict[str, tuple] = {}
+    for score, media_uuid, card_uuid in hits:          # best first
+        if media_uuid in live_media and card_uuid not in best:
+            best[card_uuid] = (score, live_media[media_uuid])
+    cards = {
+        c.card_uuid: c
+        for c in db.query(Card).filter(Card.card_uuid.in_(list(best)), Card.deleted_at.is_(None))
+    }
+    out = []
+    for card_uuid, (score, m) in best.items():
+        if card_uuid in cards:
+            out.append({
+                "card": CardOut.model_validate(cards[card_uuid], from_attributes=True).model_dump(mode="json"),
+                "score": round(score, 4),
+                "media_uuid": m.media_uuid,
+                "thumb_url": _thumb_url(m),
+            })
+    return out[:k]
+
+@router.post("/identify")
+async def identify(
+    file: UploadFile = File(...),
+    k: int = Query(5, ge=1, le=50),
+    db: Session = Depends(get_db),
+):
+    """Top-k candidate cards for a scan, by nearest stored scans of each card."""
+    _require_numpy()
+    data = await file.read()
+    if len(data) > MAX_SIZE:
+        raise HTTPException(413, f"File too large (> {MAX_SIZE // 1024 // 1024} MB)")
+    fut = await run_in_threadpool(pipeline.submit, describe_upload, data)
+    try:
+        vector = await asyncio.wrap_future(fut)
+    except Exception:
+        raise HTTPException(415, "Could not read this image")
+    # the matrix search (and a first index load) is blocking work: keep it off the event loop
+    return {"items": await run_in_threadpool(_rank_cards, db, vector, k)}
+
+def _identify_job(spool: str, paths: List[tuple], k: int):
+    """Job body for a batch of scans spooled under spool: [(filename, path)]."""
+    def work(job: Job):
+        db = SessionLocal()
+        results = []
+        try:
+            for i in range(0, len(paths), PIPELINE_ROUND):
+                chunk = paths[i:i + PIPELINE_ROUND]
+                futs = [(name, pipeline.submit(describe_file, path)) for name, path in chunk]
+                for name, fut in futs:
+                    try:
+                        results.append({"filename": name, "items": _rank_cards(db, fut.result(), k)})
+                    except Exception as e:
+                        results.append({"filename": name, "items": [], "error": f"{type(e).__name__}: {e}"})
+                job.progress(len(results), rows_total=len(paths))
+            return {"ok": True, "results": results}
+        finally:
+            db.close()
+    return work
+
+@router.post("/identify/batch", status_code=202)
+async def identify_batch(
+    files: List[UploadFile] = File(...),
+    k: int = Query(5, ge=1, le=50),
+):
+    """Identify a stack of scans as a background job; poll /v1/jobs/{job_id}."""
+    _require_numpy()
+    if len(files) > MAX_IDENTIFY_BATCH:
+        raise HTTPException(400, f"At most {MAX_IDENTIFY_BATCH} images per batch")
+    # the uploads are gone after this request, so keep copies for the job
+    spool = tempfile.mkdtemp(prefix="identify_")
+    paths = []
+    try:
+        for i, f in enumerate(files):
+            data = await f.read()
+            if len(data) > MAX_SIZE:
+                raise HTTPException(413, f"{f.filename}: file too large (> {MAX_SIZE // 1024 // 1024} MB)")
+            path = os.path.join(spool, f"{i:05d}")
+            with open(path, "wb") as out:
+                out.write(data)
+            paths.append((f.filename, path))
+        job = submit_or_429("identify_batch", _identify_job(spool, paths, k), {"images": len(paths)},
+                            on_done=lambda: shutil.rmtree(spool, ignore_errors=True))
+    except HTTPException:
+        shutil.rmtree(spool, ignore_errors=True)
+        raise
+    return {"ok": True, "job_id": job.job_id, "status_url": f"/v1/jobs/{job.job_id}"}
+
+def _features_backfill(job: Job):
+    """Job body: describe every live media blob without a current descriptor."""
+    db = SessionLocal()
+    try:
+        blobs = (
+            db.query(Media.sha256, func.min(Media.path))
+            .outerjoin(MediaFeature, MediaFeature.sha256 == Media.sha256)
+            .filter(Media.sha256.isnot(None), Media.deleted_at.is_(None))
+            .filter((MediaFeature.sha256.is_(None)) | (MediaFeature.version != VERSION))
+            .group_by(Media.sha256)
+            .all()
+        )
+        done = described = failed = 0
+        for i in range(0, len(blobs), PIPELINE_ROUND):
+            chunk = blobs[i:i + PIPELINE_ROUND]
+            futs = [(sha, pipeline.submit(describe_file, os.path.join(MEDIA_DIR, path))) for sha, path in chunk]
+            for sha, fut in futs:
+                try:
+                    db.execute(feature_upsert(sha, fut.result()))
+                    vector_index.add_blob(db, sha)
+                    described += 1
+                except Exception:
+                    failed += 1           # missing or unreadable blob
+            db.commit()
+            done += len(chunk)
+            job.progress(done, rows_total=len(blobs))
+        return {"ok": True, "blobs": len(blobs), "described": described, "failed": failed}
+    finally:
+        db.close()
+
+@router.post("/features/backfill", status_code=202)
+def backfill_features():
+    """Compute match descriptors for existing media as a background job."""
+    _require_numpy()
+    job = submit_or_429("features_backfill", _features_backfill)
+    return {"ok": True, "job_id": job.job_id, "status_url": f"/v1/jobs/{job.job_id}"}
@@ -1,44 +1,231 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from io import StringIO
+from typing import Any, Dict, Iterable, List, Optional
 import csv
+import io
+import os
+import re
+import shutil
+import tempfile
+import time
 from uuid import uuid4
 from datetime import datetime
+from ..db import SessionLocal
 from ..deps import get_db
+from ..jobs import Job
 from ..models import Card
+from ..settings import settings
+from .cards import canon, invalidate_card_counts
+from .jobs import submit_or_429
 
 router = APIRouter(prefix="/v1/import", tags=["import"])
 now = lambda: datetime.utcnow().isoformat(timespec="seconds") + "Z"
 
+BATCH_ROWS = 1000   # rows per upsert + commit
+IMPORT_FIELDS = ["year", "brand", "set_name", "subset", "card_no", "player", "team", "sport",
+                 "parallel", "variant", "print_run", "notes"]
+IDENTITY_FIELDS = ("brand", "set_name", "card_no", "player")   # a row needs at least one
+REPORTS_DIR = os.path.join(os.path.dirname(settings.db_path) or ".", "import_reports")
+REPORT_MAX_AGE = 7 * 24 * 3600   # seconds an error report stays downloadable
+
+def _clean(v: Optional[str]) -> Optional[str]:
+    v = (v or "").strip()
+    return v or None
+
+def _parse_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """CSV dict -> card fields; raises ValueError with a user-facing message."""
+    d = {f: _clean(row.get(f)) for f in IMPORT_FIELDS}
+    if d["year"] is not None:
+        if not d["year"].isdigit():
+            raise ValueError(f"year must be an integer, got {d['year']!r}")
+        d["year"] = int(d["year"])
+    if not any(d[f] for f in IDENTITY_FIELDS):
+        raise ValueError("row has none of brand/set_name/card_no/player")
+    return d
+
+class CsvImport:
+    """
+    Streams CSV rows into cards as INSERT ... ON CONFLICT(tenant_id, canonical_key)
+    DO UPDATE batches, one commit per batch. Rows identical to what is already
+    stored are skipped; a card repeated in the file takes its last row, and the
+    rows it replaces count as skipped. Bad rows go to a CSV error report.
+    """
+
+    def __init__(self, db: Session, report_path: str, batch_rows: int = BATCH_ROWS):
+        self.db = db
+        self.batch_rows = batch_rows
+        self.report_path = report_path
+        self.created = self.updated = self.skipped = self.errors = 0
+        self.rows_done = 0
+        self._report = None
+        self._report_writer = None
+
+        ins = sqlite_insert(Card.__table__)
+        self.stmt = ins.on_conflict_do_update(
+            index_elements=["tenant_id", "canonical_key"],
+            # re-importing a deleted card brings it back
+            set_={**{f: ins.excluded[f] for f in IMPORT_FIELDS + ["updated_at"]}, "deleted_at": None},
+        )
+
+    def _error(self, line_no: int, message: str, row: Dict[str, Any]):
+        if self._report is None:
+            os.makedirs(os.path.dirname(self.report_path), exist_ok=True)
+            self._report = open(self.report_path, "w", newline="", encoding="utf-8")
+            self._report_writer = csv.writer(self._report)
+            self._report_writer.writerow(["line", "error"] + IMPORT_FIELDS)
+        self._report_writer.writerow([line_no, message] + [row.get(f) for f in IMPORT_FIELDS])
+        self.errors += 1
+
+    def _flush(self, batch: Dict[str, Dict[str, Any]]):
+        if not batch:
+            return
+        existing = {
+            r[0]: tuple(r[1:])
+            for r in self.db.execute(
+                select(Card.canonical_key, Card.deleted_at, *[getattr(Card, f) for f in IMPORT_FIELDS])
+                .where(Card.tenant_id == "local", Card.canonical_key.in_(list(batch)))
+            )
+        }
+        ts = now()
+        rows: List[Dict[str, Any]] = []
+        for key, d in batch.items():
+            prev = existing.get(key)
+            if prev is not None and prev[0] is None and prev[1:] == tuple(d[f] for f in IMPORT_FIELDS):
+                self.skipped += 1
+                continue
+            if prev is None:
+                self.created += 1
+            else:
+                self.updated += 1
+            rows.append({
+                **d,
+                "card_uuid": f"c_{uuid4()}",      # ignored on conflict
+                "tenant_id": "local", "schema_version": "v1",
+                "created_at": ts, "updated_at": ts,
+                "canonical_key": key,
+            })
+        if rows:
+            self.db.execute(self.stmt, rows)
+        self.db.commit()
+
+    def run(self, lines: Iterable[str], progress=None) -> Dict[str, Any]:
+        reader = csv.DictReader(lines)
+        batch: Dict[str, Dict[str, Any]] = {}
+        try:
+            while True:
+                try:
+                    row = next(reader)
+                except StopIteration:
+                    break
+                except csv.Error as e:
+                    # e.g. an oversized field; the reader resumes at the next line
+                    self.rows_done += 1
+                    self._error(reader.line_num, f"invalid CSV: {e}", {})
+                    continue
+                self.rows_done += 1
+                try:
+                    d = _parse_row(row)
+                except ValueError as e:
+                    self._error(reader.line_num, str(e), row)
+                    continue
+                key = canon(d["year"], d["brand"], d["set_name"], d["subset"],
+                            d["card_no"], d["parallel"], d["variant"])
+                if key in batch:
+                    # same card twice in one batch: last wins, as it does across batches (upsert)
+                    self.skipped += 1
+                batch[key] = d
+                if len(batch) >= self.batch_rows:
+                    self._flush(batch)
+                    batch = {}
+                    if progress:
+                        progress(self.rows_done)
+            self._flush(batch)
+            if progress:
+                progress(self.rows_done)
+        finally:
+            if self._report is not None:
+                self._report.close()
+            invalidate_card_counts()
+        return self.summary()
+
+    def summary(self) -> Dict[str, Any]:
+        report_id = os.path.splitext(os.path.basename(self.report_path))[0]
+        return {
+            "ok": True,
+            "created": self.created,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "error_report_url": f"/v1/import/reports/{report_id}.csv" if self.errors else None,
+        }
+
+def _prune_reports():
+    """Delete error reports older than REPORT_MAX_AGE."""
+    cutoff = time.time() - REPORT_MAX_AGE
+    try:
+        entries = list(os.scandir(REPORTS_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+def new_report_path() -> str:
+    _prune_reports()
+    return os.path.join(REPORTS_DIR, f"r_{uuid4().hex}.csv")
+
+def _import_job(path: str):
+    """Job body for a background CSV import of an upload spooled to path."""
+    def work(job: Job):
+        size = os.path.getsize(path) or 1
+        db = SessionLocal()
+        try:
+            with open(path, "rb") as raw:
+                lines = io.TextIOWrapper(raw, encoding="utf-8-sig", errors="ignore", newline="")
+                return CsvImport(db, new_report_path()).run(
+                    lines, progress=lambda n: job.progress(n, fraction=raw.tell() / size),
+                )
+        finally:
+            db.close()
+    return work
+
 @router.post("/cards.csv")
-async def import_cards(file: UploadFile = File(...), db: Session = Depends(get_db)):
+def import_cards(
+    file: UploadFile = File(...),
+    background: bool = Query(False, description="Run as a job; poll /v1/jobs/{job_id}"),
+    db: Session = Depends(get_db),
+):
     if not file.filename or not file.filename.lower().endswith(".csv"):
         raise HTTPException(400, "Please upload a .csv file")
 
-    raw = (await file.read()).decode("utf-8", errors="ignore")
-    reader = csv.DictReader(StringIO(raw))
-    created, errors = 0, 0
-    for row in reader:
-        try:
-            card = Card(
-                card_uuid=f"c_{uuid4()}",
-                tenant_id="local", schema_version="v1",
-                created_at=now(), updated_at=now(),
-                year=int(row["year"]) if (row.get("year") or "").strip().isdigit() else None,
-                brand=row.get("brand") or None,
-                set_name=row.get("set_name") or None,
-                subset=row.get("subset") or None,
-                card_no=row.get("card_no") or None,
-                player=row.get("player") or None,
-                team=row.get("team") or None,
-                sport=row.get("sport") or None,
-                parallel=row.get("parallel") or None,
-                variant=row.get("variant") or None,
-                print_run=int(row["print_run"]) if (row.get("print_run") or "").strip().isdigit() else None,
-                notes=row.get("notes") or None,
-            )
-            db.add(card); created += 1
-        except Exception:
-            errors += 1
-    db.commit()
-    return {"ok": True, "created": created, "errors": errors}
+    if background:
+        # the upload is gone after this request, so keep a copy for the job
+        fd, path = tempfile.mkstemp(suffix=".csv", prefix="import_")
+        with os.fdopen(fd, "wb") as out:
+            shutil.copyfileobj(file.file, out)
+        # the runner removes the copy once the job ends, is cancelled or is refused
+        job = submit_or_429("import_csv", _import_job(path), {"filename": file.filename},
+                            on_done=lambda: os.remove(path))
+        return {"ok": True, "job_id": job.job_id, "status_url": f"/v1/jobs/{job.job_id}"}
+
+    # decode incrementally straight off the spooled upload
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="ignore", newline="")
+    try:
+        return CsvImport(db, new_report_path()).run(lines)
+    finally:
+        lines.detach()
+
+@router.get("/reports/{report_id}.csv")
+def download_report(report_id: str):
+    if not re.fullmatch(r"r_[0-9a-f]{32}", report_id):
+        raise HTTPException(404, "Report not found")
+    path = os.path.join(REPORTS_DIR, f"{report_id}.csv")
+    if not os.path.exists(path):
+        raise HTTPException(404, "Report not found")
+    return FileResponse(path, media_type="text/csv", filename=f"{report_id}.csv")
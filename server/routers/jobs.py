@@ -0,0 +1,64 @@
+from fastapi import APIRouter, HTTPException
+
+from ..cardlists import SPORT_DIRS, list_release_files_under_root, run_import
+from ..jobs import Job, JobQueueFull, runner
+from .cards import invalidate_card_counts
+from ..schemas import CardListsImportRequest
+
+router = APIRouter(prefix="/v1/jobs", tags=["jobs"])
+
+def submit_or_429(kind: str, fn, params=None, on_done=None) -> Job:
+    try:
+        return runner.submit(kind, fn, params, on_done)
+    except JobQueueFull:
+        raise HTTPException(429, "Too many jobs queued; try again later")
+
+@router.get("")
+def list_jobs():
+    return [j.to_dict() for j in runner.list()]
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    job = runner.get(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job.to_dict()
+
+@router.post("/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = runner.cancel(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job.to_dict()
+
+@router.post("/cardlists", status_code=202)
+def submit_cardlists_import(payload: CardListsImportRequest):
+    if payload.engine not in ("orm", "bulk"):
+        raise HTTPException(400, "engine must be orm or bulk")
+    if payload.root:
+        only = None if (not payload.sport or payload.sport == "All") else payload.sport
+        pairs = list_release_files_under_root(payload.root, only_sport=only,
+                                              include_categories=payload.include_categories)
+    elif payload.release:
+        if payload.sport not in SPORT_DIRS.values():
+            raise HTTPException(400, f"sport must be one of {sorted(SPORT_DIRS.values())}")
+        pairs = [(payload.release, payload.sport)]
+    else:
+        raise HTTPException(400, "Provide root or release + sport")
+    if not pairs:
+        raise HTTPException(400, "No release files found")
+
+    def work(job: Job):
+        try:
+            return run_import(
+                pairs,
+                engine=payload.engine,
+                workers=payload.workers,
+                incremental=payload.incremental,
+                progress=lambda files_done, files_total, rows: job.progress(rows, fraction=files_done / files_total),
+            )
+        finally:
+            invalidate_card_counts()
+
+    job = submit_or_429("cardlists", work, payload.model_dump())
+    return job.to_dict()
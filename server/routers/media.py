@@ -1,26 +1,47 @@
 # server/routers/media.py
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Query, Body, Request, Response
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from starlette.concurrency import run_in_threadpool
 from uuid import uuid4
 from datetime import datetime
 from typing import Optional
 
+import asyncio
 import os
+import re
+import time
 import hashlib
 
-from PIL import Image, ImageOps  # EXIF-aware rotate
-
-from ..deps import get_db
-from ..models import Media, Card, Ownership
+from ..deps import get_db, get_async_db
+from ..db import SessionLocal
+from ..images import (pipeline, render_image, rendition_upsert, phash_file, record_phash,
+                      EAGER_RENDITIONS, RENDITION_FORMATS, RENDITION_SIZES)
+from ..jobs import Job
+from ..models import Media, MediaRendition, Card, Ownership
+from ..features import index as vector_index
+from ..phash import index as phash_index
 
 router = APIRouter(prefix="/v1/media", tags=["media"])
 
 # ---------- config ----------
 MEDIA_DIR = "media"
-THUMB_SUBDIR = "thumbs"              # media/thumbs/
+RENDITIONS_SUBDIR = "renditions"     # media/renditions/<ab>/<cd>/<sha>_<size>.<fmt>
+THUMB_RENDITION = ("sm", "webp")     # thumb_url in API responses
 MAX_SIZE = 15 * 1024 * 1024          # 15 MB
 ALLOWED_EXT = {".jpg", ".jpeg", ".png", ".webp"}
 ALLOWED_KINDS = {"front", "back"}    # ✨ two-sided support
+MAX_PAIR_BATCH = 500                 # card_uuids per /pairs request
+PHASH_BACKFILL_BATCH = 64            # images hashed per pipeline round in the backfill job
+GC_GRACE_SEC = 3600                  # never collect blobs younger than this (upload in flight)
+IMMUTABLE = "public, max-age=31536000, immutable"
+# <ab>/<cd>/<sha><ext> originals and renditions/<ab>/<cd>/<sha>_<size>.<fmt>: the name is the content
+CONTENT_ADDRESSED = re.compile(r"(?:renditions/)?[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64}(?:_[a-z]+\.[a-z0-9]+)?)(?:\.[a-z0-9]+)?")
 
 now = lambda: datetime.utcnow().isoformat(timespec="seconds") + "Z"
 
@@ -28,27 +49,87 @@ now = lambda: datetime.utcnow().isoformat(timespec="seconds") + "Z"
 def _public_url(rel: Optional[str]) -> Optional[str]:
     return f"/media/{rel}" if rel else None
 
-def _ensure_dirs():
-    os.makedirs(MEDIA_DIR, exist_ok=True)
-    os.makedirs(os.path.join(MEDIA_DIR, THUMB_SUBDIR), exist_ok=True)
+def _shard(sha: str) -> str:
+    return f"{sha[:2]}/{sha[2:4]}"
+
+def _blob_rel(sha: str, ext: str) -> str:
+    """Content-addressed original: '<ab>/<cd>/<sha><ext>' under MEDIA_DIR."""
+    return f"{_shard(sha)}/{sha}{ext}"
+
+def _rendition_rel(sha: str, size: str, fmt: str) -> str:
+    return f"{RENDITIONS_SUBDIR}/{_shard(sha)}/{sha}_{size}.{fmt}"
+
+def _rendition_targets(sha: str, wanted):
+    """[(size, fmt)] -> (pipeline targets, {(size, fmt): rel path})"""
+    rels = {(size, fmt): _rendition_rel(sha, size, fmt) for size, fmt in wanted}
+    return [(size, fmt, os.path.join(MEDIA_DIR, rel)) for (size, fmt), rel in rels.items()], rels
 
-def _make_thumbnail(abs_path: str, media_uuid: str, max_side: int = 320) -> Optional[str]:
+def _thumb_url(m: Media) -> Optional[str]:
+    if not m.sha256:
+        return _public_url(m.path)
+    size, fmt = THUMB_RENDITION
+    return f"/v1/media/renditions/{m.sha256}/{size}.{fmt}"
+
+def _store_original(data: bytes, abs_path: str):
+    os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+    tmp = f"{abs_path}.{uuid4().hex}.tmp"      # concurrent uploads of the same blob
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, abs_path)
+
+def _index_blob(sha: str):
+    """Add a blob's card-linked vectors to the match index (sync session; run in a thread)."""
+    db = SessionLocal()
+    try:
+        vector_index.add_blob(db, sha)
+    finally:
+        db.close()
+
+async def _stored_copy(db: AsyncSession, sha: str) -> Optional[Media]:
+    """A media row whose blob has this sha and is still on disk (rows with dimensions first)."""
+    rows = (
+        await db.execute(
+            select(Media).where(Media.sha256 == sha).order_by(Media.width.is_(None), Media.created_at.desc())
+        )
+    ).scalars()
+    for m in rows:
+        if os.path.exists(os.path.join(MEDIA_DIR, m.path)):
+            return m
+    return None
+
+class _MediaFileResponse(FileResponse):
+    chunk_size = 1024 * 1024      # scans are multi-MB; fewer, larger reads per response
+
+def _cached_file(path: str, etag: str, request_headers: Headers, media_type: Optional[str] = None,
+                 stat_result: Optional[os.stat_result] = None) -> Response:
     """
-    Create JPEG thumbnail from abs_path -> media/thumbs/<uuid>.jpg
-    Returns relative path 'thumbs/<uuid>.jpg' or None on failure.
+    FileResponse for content that never changes under its URL: strong ETag, a year
+    of immutable caching, 304 on If-None-Match. Range requests are handled by
+    FileResponse (and the body goes out via pathsend when the server offers it).
+    """
+    response = _MediaFileResponse(path, media_type=media_type, stat_result=stat_result)
+    response.headers["etag"] = f'"{etag}"'
+    response.headers["cache-control"] = IMMUTABLE
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or response.headers["etag"] in
+                          [t.strip().removeprefix("W/") for t in if_none_match.split(",")]):
+        return NotModifiedResponse(response.headers)
+    return response
+
+class MediaFiles(StaticFiles):
+    """
+    /media. Content-addressed files get a strong ETag (their sha256) and immutable
+    caching; legacy m_<uuid> files keep Starlette's mtime/size ETag and are revalidated.
     """
-    try:
-        with Image.open(abs_path) as im:
-            # normalize orientation (EXIF)
-            im = ImageOps.exif_transpose(im)
-            im = im.convert("RGB")
-            im.thumbnail((max_side, max_side))
-            rel = f"{THUMB_SUBDIR}/{media_uuid}.jpg"
-            out_path = os.path.join(MEDIA_DIR, rel)
-            im.save(out_path, "JPEG", quality=85, optimize=True)
-            return rel
-    except Exception:
-        return None
+
+    def file_response(self, full_path, stat_result, scope, status_code=200) -> Response:
+        rel = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        m = CONTENT_ADDRESSED.fullmatch(rel)
+        if m is not None and status_code == 200:
+            return _cached_file(full_path, m.group(1), Headers(scope=scope), stat_result=stat_result)
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["cache-control"] = "no-cache"
+        return response
 
 # ---------- routes ----------
 
@@ -58,13 +139,13 @@ async def upload_media(
     card_uuid: Optional[str] = Form(None),
     ownership_uuid: Optional[str] = Form(None),
     kind: Optional[str] = Form(None),  # 'front' | 'back' (optional)
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if not card_uuid and not ownership_uuid:
         raise HTTPException(400, "Provide card_uuid or ownership_uuid")
-    if card_uuid and not db.query(Card).filter_by(card_uuid=card_uuid).first():
+    if card_uuid and not await db.scalar(select(Card.card_uuid).filter_by(card_uuid=card_uuid)):
         raise HTTPException(400, "card_uuid not found")
-    if ownership_uuid and not db.query(Ownership).filter_by(ownership_uuid=ownership_uuid).first():
+    if ownership_uuid and not await db.scalar(select(Ownership.ownership_uuid).filter_by(ownership_uuid=ownership_uuid)):
         raise HTTPException(400, "ownership_uuid not found")
 
     # Validate kind if provided
@@ -75,8 +156,6 @@ async def upload_media(
             raise HTTPException(400, f"kind must be one of {sorted(ALLOWED_KINDS)}")
         kind_norm = k
 
-    _ensure_dirs()
-
     # Basic file checks
     ext = os.path.splitext(file.filename or "")[1].lower() or ".jpg"
     if ext not in ALLOWED_EXT:
@@ -87,51 +166,26 @@ async def upload_media(
         raise HTTPException(413, f"File too large (> {MAX_SIZE // 1024 // 1024} MB)")
 
     media_uuid = f"m_{uuid4()}"
-    rel = f"{media_uuid}{ext}"
-    abs_path = os.path.join(MEDIA_DIR, rel)
 
-    # Write original
-    with open(abs_path, "wb") as f:
-        f.write(data)
-
-    # Normalize / auto-rotate; also get dimensions
-    try:
-        with Image.open(abs_path) as im:
-            im = ImageOps.exif_transpose(im)
-            im.save(abs_path, quality=90, optimize=True)
-            w, h = im.size
-    except Exception:
-        w, h = (0, 0)
-
-    # SHA for dedupe/integrity
+    # content-addressed: identical bytes share one blob, stored and processed once
     sha = hashlib.sha256(data).hexdigest()
+    stored = await _stored_copy(db, sha)
+    if stored is not None:
+        rel = stored.path
+    else:
+        rel = _blob_rel(sha, ext)
+        await run_in_threadpool(_store_original, data, os.path.join(MEDIA_DIR, rel))
 
     # If a kind is specified, optionally "replace" older media of the same kind for this target
     if kind_norm:
-        if card_uuid:
-            priors = (
-                db.query(Media)
-                .filter(
-                    Media.card_uuid == card_uuid,
-                    Media.kind == kind_norm,
-                    Media.deleted_at.is_(None),
-                )
-                .all()
+        target = Media.card_uuid == card_uuid if card_uuid else Media.ownership_uuid == ownership_uuid
+        priors = (
+            await db.execute(
+                select(Media).where(target, Media.kind == kind_norm, Media.deleted_at.is_(None))
             )
-            for p in priors:
-                p.deleted_at = now()
-        elif ownership_uuid:
-            priors = (
-                db.query(Media)
-                .filter(
-                    Media.ownership_uuid == ownership_uuid,
-                    Media.kind == kind_norm,
-                    Media.deleted_at.is_(None),
-                )
-                .all()
-            )
-            for p in priors:
-                p.deleted_at = now()
+        ).scalars().all()
+        for p in priors:
+            p.deleted_at = now()
 
     # Create DB row
     m = Media(
@@ -145,95 +199,217 @@ async def upload_media(
         kind=kind_norm,
         card_uuid=card_uuid,
         ownership_uuid=ownership_uuid,
-        width=str(w),
-        height=str(h),
+        width=stored.width if stored else None,
+        height=stored.height if stored else None,
+        phash=stored.phash if stored else None,
         filesize_bytes=str(len(data)),
     )
 
-    # Optional: generate a thumbnail and store if the model supports it
-    thumb_rel = _make_thumbnail(abs_path, media_uuid)
-    if thumb_rel and hasattr(m, "thumbnail_path"):
-        setattr(m, "thumbnail_path", thumb_rel)
-
     db.add(m)
-    db.commit()
-    db.refresh(m)
+    await db.commit()
+    if m.phash:
+        phash_index.add(m.media_uuid, m.phash)
+    if stored is not None:
+        await run_in_threadpool(_index_blob, sha)
+
+    # dimensions + phash + eager renditions happen in the image pipeline; they are
+    # filled in on every row of this sha when it finishes (submit waits if the
+    # pipeline is full)
+    if stored is None:
+        targets, rels = _rendition_targets(sha, EAGER_RENDITIONS)
+        await run_in_threadpool(pipeline.process_upload, sha, os.path.join(MEDIA_DIR, rel), targets, rels)
 
     return {
         "ok": True,
         "media_uuid": m.media_uuid,
         "kind": m.kind,
         "url": _public_url(m.path),
-        "thumb_url": _public_url(getattr(m, "thumbnail_path", None) or m.path),
+        "thumb_url": _thumb_url(m),
     }
 
 
 @router.get("/latest")
-def latest_for_card(
+async def latest_for_card(
     card_uuid: str = Query(..., description="Card UUID"),
     kind: Optional[str] = Query(None, description="Optional filter (front|back)"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     q = (
-        db.query(Media)
+        select(Media)
         .filter(Media.card_uuid == card_uuid, Media.deleted_at.is_(None))
         .order_by(Media.created_at.desc())
     )
     if kind:
         q = q.filter(Media.kind == kind.strip().lower())
 
-    m = q.first()
+    m = (await db.execute(q.limit(1))).scalars().first()
     if not m:
         return {"url": None, "thumb_url": None}
 
-    thumb_rel = getattr(m, "thumbnail_path", None)
     return {
         "media_uuid": m.media_uuid,
         "kind": getattr(m, "kind", None),
         "url": _public_url(m.path),
-        "thumb_url": _public_url(thumb_rel or m.path),
+        "thumb_url": _thumb_url(m),
+        "created_at": m.created_at,
+    }
+
+def _pair_item(m: Media) -> dict:
+    return {
+        "media_uuid": m.media_uuid,
+        "url": _public_url(m.path),
+        "thumb_url": _thumb_url(m),
         "created_at": m.created_at,
     }
 
+async def latest_pairs(db: AsyncSession, card_uuids: list[str]) -> dict[str, dict]:
+    """
+    Newest live front/back for many cards in one windowed query
+    (served by ix_media_card_kind_live). Every requested uuid gets an entry.
+    """
+    out = {cu: {"front": None, "back": None} for cu in card_uuids}
+    if not card_uuids:
+        return out
+
+    rn = func.row_number().over(
+        partition_by=(Media.card_uuid, Media.kind),
+        order_by=Media.created_at.desc(),
+    ).label("rn")
+    ranked = (
+        select(Media, rn)
+        .where(
+            Media.card_uuid.in_(card_uuids),
+            Media.kind.in_(ALLOWED_KINDS),
+            Media.deleted_at.is_(None),
+        )
+        .subquery()
+    )
+    latest = aliased(Media, ranked)
+    for m in (await db.execute(select(latest).where(ranked.c.rn == 1))).scalars():
+        out[m.card_uuid][m.kind] = _pair_item(m)
+    return out
+
 @router.get("/pair")
-def pair_for_card(
+async def pair_for_card(
     card_uuid: str = Query(..., description="Card UUID"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return (await latest_pairs(db, [card_uuid]))[card_uuid]
+
+@router.post("/pairs")
+async def pairs_for_cards(
+    card_uuids: list[str] = Body(..., embed=True, max_length=MAX_PAIR_BATCH),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    def latest_by(kind: str):
-        q = (
-            db.query(Media)
-            .filter(
-                Media.card_uuid == card_uuid,
-                Media.deleted_at.is_(None),
-                Media.kind == kind,
+    """Bulk /pair: {card_uuid: {"front": ..., "back": ...}} for up to MAX_PAIR_BATCH cards."""
+    return {"pairs": await latest_pairs(db, list(dict.fromkeys(card_uuids)))}
+
+@router.get("/renditions/{sha256}/{size}.{fmt}")
+async def get_rendition(sha256: str, size: str, fmt: str, request: Request,
+                        db: AsyncSession = Depends(get_async_db)):
+    """
+    A downscaled copy of the blob with this sha256. Rendered in the image
+    pipeline on first request, then served from the disk cache.
+    """
+    if size not in RENDITION_SIZES or fmt not in RENDITION_FORMATS or not re.fullmatch(r"[0-9a-f]{64}", sha256):
+        raise HTTPException(404, "Rendition not found")
+    media_type = RENDITION_FORMATS[fmt][1]
+    rel = _rendition_rel(sha256, size, fmt)
+    abs_path = os.path.join(MEDIA_DIR, rel)
+    if not os.path.exists(abs_path):
+        stored = await _stored_copy(db, sha256)
+        if stored is None:
+            raise HTTPException(404, "Rendition not found")
+        targets, rels = _rendition_targets(sha256, [(size, fmt)])
+        fut = await run_in_threadpool(pipeline.submit, render_image, os.path.join(MEDIA_DIR, stored.path), targets)
+        try:
+            renditions = await asyncio.wrap_future(fut)
+        except Exception:
+            raise HTTPException(415, "Could not render this image")
+        await db.execute(*rendition_upsert(sha256, renditions, rels))
+        await db.commit()
+    return _cached_file(abs_path, f"{sha256}_{size}.{fmt}", request.headers, media_type=media_type)
+
+@router.get("/similar")
+async def similar_media(
+    media_uuid: str = Query(..., description="Media to find near-duplicates of"),
+    max_distance: int = Query(10, ge=0, le=32, description="Max Hamming distance between phashes"),
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+):
+    m = await db.get(Media, media_uuid)
+    if m is None or m.deleted_at is not None:
+        raise HTTPException(404, "media not found")
+    if not m.phash:
+        raise HTTPException(409, "media has no phash yet (still processing, or run /v1/media/phash/backfill)")
+
+    hits = [(d, u) for d, u in await run_in_threadpool(phash_index.similar, m.phash, max_distance)
+            if u != media_uuid]
+    rows = {
+        r.media_uuid: r
+        for r in (
+            await db.execute(
+                select(Media).where(Media.media_uuid.in_([u for _, u in hits]), Media.deleted_at.is_(None))
             )
-            .order_by(Media.created_at.desc())
-        )
-        m = q.first()
-        if not m:
-            return None
-        thumb_rel = getattr(m, "thumbnail_path", None)
-        return {
-            "media_uuid": m.media_uuid,
-            "url": _public_url(m.path),
-            "thumb_url": _public_url(thumb_rel or m.path),
-            "created_at": m.created_at,
+        ).scalars()
+    } if hits else {}
+    items = [
+        {
+            "media_uuid": u,
+            "card_uuid": rows[u].card_uuid,
+            "ownership_uuid": rows[u].ownership_uuid,
+            "kind": rows[u].kind,
+            "distance": d,
+            "url": _public_url(rows[u].path),
+            "thumb_url": _thumb_url(rows[u]),
         }
+        for d, u in hits if u in rows
+    ]
+    return {"media_uuid": media_uuid, "phash": m.phash, "items": items[:limit]}
 
-    return {
-        "front": latest_by("front"),
-        "back": latest_by("back"),
-    }
+def _phash_backfill(job: Job):
+    """Job body: hash every live media blob that has no phash yet."""
+    db = SessionLocal()
+    try:
+        blobs = (
+            db.query(Media.sha256, func.min(Media.path))
+            .filter(Media.phash.is_(None), Media.sha256.isnot(None), Media.deleted_at.is_(None))
+            .group_by(Media.sha256)
+            .all()
+        )
+        done = hashed = failed = 0
+        for i in range(0, len(blobs), PHASH_BACKFILL_BATCH):
+            chunk = blobs[i:i + PHASH_BACKFILL_BATCH]
+            futs = [(sha, pipeline.submit(phash_file, os.path.join(MEDIA_DIR, path))) for sha, path in chunk]
+            for sha, fut in futs:
+                try:
+                    record_phash(db, sha, fut.result())
+                    hashed += 1
+                except Exception:
+                    failed += 1           # missing or unreadable blob
+            db.commit()
+            done += len(chunk)
+            job.progress(done, rows_total=len(blobs))
+        return {"ok": True, "blobs": len(blobs), "hashed": hashed, "failed": failed}
+    finally:
+        db.close()
+
+@router.post("/phash/backfill", status_code=202)
+def backfill_phash():
+    """Compute phash for existing media as a background job; poll /v1/jobs/{job_id}."""
+    from .jobs import submit_or_429   # routers.jobs -> cards -> media
+
+    job = submit_or_429("phash_backfill", _phash_backfill)
+    return {"ok": True, "job_id": job.job_id, "status_url": f"/v1/jobs/{job.job_id}"}
 
 @router.get("", response_model=list[dict])  # simple shape for now
-def list_media(
+async def list_media(
     card_uuid: Optional[str] = None,
     ownership_uuid: Optional[str] = None,
     kind: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    q = db.query(Media).filter(Media.deleted_at.is_(None))
+    q = select(Media).filter(Media.deleted_at.is_(None))
     if card_uuid:
         q = q.filter(Media.card_uuid == card_uuid)
     if ownership_uuid:
@@ -241,10 +417,9 @@ def list_media(
     if kind:
         q = q.filter(Media.kind == kind.strip().lower())
 
-    rows = q.order_by(Media.created_at.desc()).all()
+    rows = (await db.execute(q.order_by(Media.created_at.desc()))).scalars().all()
     out = []
     for m in rows:
-        thumb_rel = getattr(m, "thumbnail_path", None)
         out.append(
             {
                 "media_uuid": m.media_uuid,
@@ -252,8 +427,58 @@ def list_media(
                 "ownership_uuid": m.ownership_uuid,
                 "kind": getattr(m, "kind", None),
                 "url": _public_url(m.path),
-                "thumb_url": _public_url(thumb_rel or m.path),
+                "thumb_url": _thumb_url(m),
                 "created_at": m.created_at,
             }
         )
     return out
+
+
+def _sharded_blobs():
+    """(rel, sha) for every content-addressed original under MEDIA_DIR/<ab>/<cd>/."""
+    shard = re.compile(r"[0-9a-f]{2}")
+    for a in sorted(os.listdir(MEDIA_DIR)) if os.path.isdir(MEDIA_DIR) else []:
+        if not shard.fullmatch(a):
+            continue
+        for b in sorted(os.listdir(os.path.join(MEDIA_DIR, a))):
+            d = os.path.join(MEDIA_DIR, a, b)
+            if not shard.fullmatch(b) or not os.path.isdir(d):
+                continue
+            for name in os.listdir(d):
+                sha = name.split(".", 1)[0]
+                if re.fullmatch(r"[0-9a-f]{64}", sha):
+                    yield f"{a}/{b}/{name}", sha
+
+@router.post("/gc")
+def collect_blobs(
+    dry_run: bool = Query(False, description="Report what would be removed"),
+    db: Session = Depends(get_db),
+):
+    """
+    Delete content-addressed blobs (and their renditions) that no live media row
+    references. Reference counts come from the media rows; legacy m_<uuid> files
+    are left alone.
+    """
+    refs = dict(
+        db.query(Media.path, func.count())
+        .filter(Media.deleted_at.is_(None))
+        .group_by(Media.path)
+        .all()
+    )
+    cutoff = time.time() - GC_GRACE_SEC
+    removed, freed = [], 0
+    for rel, sha in _sharded_blobs():
+        abs_path = os.path.join(MEDIA_DIR, rel)
+        if refs.get(rel) or os.path.getmtime(abs_path) > cutoff:
+            continue
+        removed.append(rel)
+        freed += os.path.getsize(abs_path)
+        if not dry_run:
+            os.remove(abs_path)
+            for r in db.query(MediaRendition).filter(MediaRendition.sha256 == sha):
+                if os.path.exists(os.path.join(MEDIA_DIR, r.path)):
+                    os.remove(os.path.join(MEDIA_DIR, r.path))
+                db.delete(r)
+    if not dry_run:
+        db.commit()
+    return {"ok": True, "dry_run": dry_run, "removed": len(removed), "bytes_freed": freed, "paths": removed}
@@ -1,22 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import uuid4
 from datetime import datetime
 
-from ..deps import get_db
+from ..deps import get_db, get_async_db
 from ..models import Ownership, Card
-from ..schemas import OwnershipCreate, OwnershipOut
+from ..schemas import CardOut, OwnershipBulkCreate, OwnershipCreate, OwnershipOut
+from ..valuation import portfolio
+from .cards import _check_bulk_size, _decode_cursor, _encode_cursor, _keyset_after, apply_tokenized_search
 
 router = APIRouter(prefix="/v1/ownership", tags=["ownership"])
 now = lambda: datetime.utcnow().isoformat(timespec="seconds") + "Z"
 
-@router.get("", response_model=List[OwnershipOut])
-def list_ownership(card_uuid: Optional[str] = None, db: Session = Depends(get_db)):
-    q = db.query(Ownership).filter(Ownership.deleted_at.is_(None))
+@router.get("")  # returning dict -> don't force response_model
+async def list_ownership(
+    card_uuid: Optional[str] = None,
+    q: Optional[str] = Query(None, description="Search the owned cards (same rules as /v1/cards)"),
+    page: int = 1,
+    page_size: int = 50,
+    after: Optional[str] = Query(None, description="Opaque cursor from next_after; replaces page"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Live holdings newest first, each with its card embedded; one joined query per page."""
+    page = max(1, page)
+    page_size = min(max(1, page_size), 200)
+
+    query = (
+        select(Ownership, Card)
+        .join(Card, Card.card_uuid == Ownership.card_uuid)
+        .where(Ownership.deleted_at.is_(None))
+    )
     if card_uuid:
-        q = q.filter(Ownership.card_uuid == card_uuid)
-    return q.order_by(Ownership.updated_at.desc()).all()
+        query = query.where(Ownership.card_uuid == card_uuid)
+    if q:
+        query = apply_tokenized_search(query, q)
+    filtered = query
+
+    query = query.order_by(Ownership.updated_at.desc(), Ownership.ownership_uuid.desc())
+    if after:
+        value, last_uuid = _decode_cursor(after, "updated_at", "desc")
+        query = query.where(_keyset_after(Ownership.updated_at, value, last_uuid, True, Ownership.ownership_uuid))
+    else:
+        query = query.offset((page - 1) * page_size)
+
+    # one extra row tells us whether there is a next page
+    rows = (await db.execute(query.limit(page_size + 1))).all()
+    next_after = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1][0]
+        next_after = _encode_cursor("updated_at", "desc", last.updated_at, last.ownership_uuid)
+
+    total = (await db.execute(
+        select(func.count()).select_from(filtered.with_only_columns(Ownership.ownership_uuid).subquery())
+    )).scalar_one()
+
+    items = []
+    for o, card in rows:
+        item = OwnershipOut.model_validate(o, from_attributes=True)
+        item.card = CardOut.model_validate(card, from_attributes=True)
+        items.append(item)
+    return {"items": items, "total": total, "next_after": next_after}
 
 @router.post("", response_model=OwnershipOut)
 def create_ownership(payload: OwnershipCreate, db: Session = Depends(get_db)):
@@ -29,8 +76,37 @@ def create_ownership(payload: OwnershipCreate, db: Session = Depends(get_db)):
         **payload.model_dump(),
     )
     db.add(o); db.commit(); db.refresh(o)
+    portfolio.invalidate()
     return o
 
+@router.post("/bulk")
+def bulk_create_ownership(payload: OwnershipBulkCreate, db: Session = Depends(get_db)):
+    """Create many holdings with one executemany INSERT in one transaction; results in request order."""
+    _check_bulk_size(len(payload.items))
+    known = set(db.execute(
+        select(Card.card_uuid).where(Card.card_uuid.in_({i.card_uuid for i in payload.items}))
+    ).scalars())
+    ts = now()
+    rows, results = [], []
+    for item in payload.items:
+        if item.card_uuid not in known:
+            results.append({"card_uuid": item.card_uuid, "ok": False, "error": "card_uuid does not exist"})
+            continue
+        row = {
+            "ownership_uuid": f"o_{uuid4()}",
+            "tenant_id": "local", "schema_version": "v1",
+            "created_at": ts, "updated_at": ts,
+            **item.model_dump(),
+        }
+        rows.append(row)
+        results.append({"card_uuid": item.card_uuid, "ok": True, "ownership_uuid": row["ownership_uuid"]})
+    if rows:
+        db.execute(insert(Ownership.__table__), rows)
+    db.commit()
+    if rows:
+        portfolio.invalidate()
+    return {"ok": True, "created": len(rows), "results": results}
+
 @router.delete("/{ownership_uuid}")
 def delete_ownership(ownership_uuid: str, db: Session = Depends(get_db)):
     o = db.query(Ownership).filter(Ownership.ownership_uuid == ownership_uuid, Ownership.deleted_at.is_(None)).first()
@@ -38,4 +114,5 @@ def delete_ownership(ownership_uuid: str, db: Session = Depends(get_db)):
         raise HTTPException(404, "Ownership not found")
     o.deleted_at = now()
     db.add(o); db.commit()
+    portfolio.invalidate()
     return {"ok": True}
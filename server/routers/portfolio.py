@@ -0,0 +1,12 @@
+# server/routers/portfolio.py
+from fastapi import APIRouter
+from starlette.concurrency import run_in_threadpool
+
+from ..valuation import portfolio
+
+router = APIRouter(prefix="/v1/portfolio", tags=["portfolio"])
+
+@router.get("/summary")
+async def portfolio_summary():
+    """Market value, cost basis and unrealized gain of owned cards, with sport/year/set totals."""
+    return await run_in_threadpool(portfolio.summary)
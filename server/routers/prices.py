@@ -0,0 +1,313 @@
+# server/routers/prices.py
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+from uuid import uuid4
+from datetime import date, datetime
+from ..db import SessionLocal
+from ..deps import get_db, get_async_db
+from ..jobs import Job
+from ..models import Card, Price
+from ..price_stats import refresh as refresh_stats, refresh_all as refresh_all_stats
+from ..schemas import PriceOut
+from ..valuation import portfolio
+from .import_csv import BATCH_ROWS, new_report_path
+from .jobs import submit_or_429
+
+router = APIRouter(prefix="/v1/prices", tags=["prices"])
+now = lambda: datetime.utcnow().isoformat(timespec="seconds") + "Z"
+
+PRICE_FIELDS = ["condition_type", "grade_scale", "grade_value", "sale_date", "source_market", "source_lot_url",
+                "amount_all_in", "currency", "fees_included", "buyer_premium_pct", "is_ask_or_bid",
+                "confidence", "notes"]
+CARD_REFS = ("card_uuid", "canonical_key", "external_id")   # a row needs one; external_source narrows external_id
+CHOICES = {"is_ask_or_bid": ("SOLD", "ASK", "BID"), "confidence": ("HIGH", "MEDIUM", "LOW")}
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+_AMBIGUOUS = object()
+
+def _text(v: Any) -> Optional[str]:
+    v = "" if v is None else str(v).strip()
+    return v or None
+
+def _parse_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """CSV/NDJSON record -> price fields; raises ValueError with a user-facing message."""
+    d = {f: _text(row.get(f)) for f in PRICE_FIELDS}
+    if d["amount_all_in"] is None:
+        raise ValueError("amount_all_in is required")
+    try:
+        d["amount_all_in"] = round(float(d["amount_all_in"]), 2)
+    except ValueError:
+        raise ValueError(f"amount_all_in must be a number, got {d['amount_all_in']!r}")
+    if d["amount_all_in"] < 0:
+        raise ValueError("amount_all_in must not be negative")
+    if d["sale_date"] is None:
+        raise ValueError("sale_date is required")
+    try:
+        d["sale_date"] = date.fromisoformat(d["sale_date"][:10]).isoformat()
+    except ValueError:
+        raise ValueError(f"sale_date must be YYYY-MM-DD, got {d['sale_date']!r}")
+    for f, allowed in CHOICES.items():
+        if d[f] is not None:
+            d[f] = d[f].upper()
+            if d[f] not in allowed:
+                raise ValueError(f"{f} must be one of {'/'.join(allowed)}, got {d[f]!r}")
+    d["currency"] = (d["currency"] or "USD").upper()
+    return d
+
+def _dedupe_key(card_uuid: str, sale_date: Optional[str], market: Optional[str], amount) -> tuple:
+    return (card_uuid, sale_date, market, None if amount is None else round(float(amount), 2))
+
+class CardResolver:
+    """card_uuid / canonical_key / external_id -> live card_uuid, from maps loaded once per ingest."""
+
+    def __init__(self, db: Session):
+        self.uuids = set()
+        self.by_key: Dict[str, str] = {}
+        self.by_ext: Dict[str, Any] = {}
+        self.by_source_ext: Dict[Tuple[str, str], str] = {}
+        rows = db.execute(
+            select(Card.card_uuid, Card.canonical_key, Card.external_source, Card.external_id)
+            .where(Card.deleted_at.is_(None))
+        )
+        for card_uuid, key, source, ext in rows:
+            self.uuids.add(card_uuid)
+            if key:
+                self.by_key[key] = card_uuid
+            if ext:
+                self.by_source_ext[(source, ext)] = card_uuid
+                # the same external_id from two sources needs external_source to pick one
+                self.by_ext[ext] = card_uuid if self.by_ext.get(ext, card_uuid) == card_uuid else _AMBIGUOUS
+
+    def resolve(self, row: Dict[str, Any]) -> str:
+        card_uuid, key, ext = (_text(row.get(f)) for f in CARD_REFS)
+        if card_uuid:
+            if card_uuid not in self.uuids:
+                raise ValueError(f"no card with card_uuid {card_uuid!r}")
+            return card_uuid
+        if key:
+            found = self.by_key.get(key.lower())
+            if found is None:
+                raise ValueError(f"no card with canonical_key {key!r}")
+            return found
+        if ext:
+            source = _text(row.get("external_source"))
+            found = self.by_source_ext.get((source, ext)) if source else self.by_ext.get(ext)
+            if found is _AMBIGUOUS:
+                raise ValueError(f"external_id {ext!r} matches several sources; add external_source")
+            if found is None:
+                raise ValueError(f"no card with external_id {ext!r}")
+            return found
+        raise ValueError("row has none of card_uuid/canonical_key/external_id")
+
+def _csv_records(lines: Iterable[str]) -> Iterator[Tuple[int, Dict[str, Any], Optional[str]]]:
+    reader = csv.DictReader(lines)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield reader.line_num, {}, f"invalid CSV: {e}"
+            continue
+        yield reader.line_num, row, None
+
+def _ndjson_records(lines: Iterable[str]) -> Iterator[Tuple[int, Dict[str, Any], Optional[str]]]:
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, {}, f"invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, {}, "each line must be a JSON object"
+            continue
+        yield line_no, row, None
+
+READERS = {"csv": _csv_records, "ndjson": _ndjson_records}
+
+class PriceImport:
+    """
+    Streams sale records into prices as executemany INSERT batches, one commit
+    per batch that also refreshes price_stats for the batch's cards. Cards are
+    resolved through CardResolver; rows matching a live price on (card,
+    sale_date, source_market, amount) are skipped, including repeats within
+    the upload. Bad rows go to a CSV error report.
+    """
+
+    def __init__(self, db: Session, report_path: str, batch_rows: int = BATCH_ROWS):
+        self.db = db
+        self.batch_rows = batch_rows
+        self.report_path = report_path
+        self.inserted = self.duplicates = self.errors = 0
+        self.rows_done = 0
+        self._report = None
+        self._report_writer = None
+        self.resolver = CardResolver(db)
+        self.stmt = insert(Price.__table__)
+
+    def _error(self, line_no: int, message: str, row: Dict[str, Any]):
+        if self._report is None:
+            os.makedirs(os.path.dirname(self.report_path), exist_ok=True)
+            self._report = open(self.report_path, "w", newline="", encoding="utf-8")
+            self._report_writer = csv.writer(self._report)
+            self._report_writer.writerow(["line", "error", "row"])
+        self._report_writer.writerow([line_no, message, json.dumps(row, default=str)])
+        self.errors += 1
+
+    def _flush(self, batch: Dict[tuple, Dict[str, Any]]):
+        if not batch:
+            return
+        # seeks ix_prices_card_sale on the batch's (card, sale_date) pairs
+        existing = {
+            _dedupe_key(*r)
+            for r in self.db.execute(
+                select(Price.card_uuid, Price.sale_date, Price.source_market, Price.amount_all_in)
+                .where(tuple_(Price.card_uuid, Price.sale_date).in_({k[:2] for k in batch}),
+                       Price.deleted_at.is_(None))
+            )
+        }
+        ts = now()
+        rows: List[Dict[str, Any]] = []
+        for key, d in batch.items():
+            if key in existing:
+                self.duplicates += 1
+                continue
+            rows.append({
+                **d,
+                "price_uuid": f"p_{uuid4()}",
+                "tenant_id": "local", "schema_version": "v1",
+                "created_at": ts, "updated_at": ts,
+            })
+        if rows:
+            self.db.execute(self.stmt, rows)
+            refresh_stats(self.db, {r["card_uuid"] for r in rows})
+            self.inserted += len(rows)
+        self.db.commit()
+
+    def run(self, records: Iterable[Tuple[int, Dict[str, Any], Optional[str]]], progress=None) -> Dict[str, Any]:
+        batch: Dict[tuple, Dict[str, Any]] = {}
+        try:
+            for line_no, row, problem in records:
+                self.rows_done += 1
+                try:
+                    if problem:
+                        raise ValueError(problem)
+                    d = _parse_row(row)
+                    d["card_uuid"] = self.resolver.resolve(row)
+                except ValueError as e:
+                    self._error(line_no, str(e), row)
+                    continue
+                key = _dedupe_key(d["card_uuid"], d["sale_date"], d["source_market"], d["amount_all_in"])
+                if key in batch:
+                    self.duplicates += 1
+                    continue
+                batch[key] = d
+                if len(batch) >= self.batch_rows:
+                    self._flush(batch)
+                    batch = {}
+                    if progress:
+                        progress(self.rows_done)
+            self._flush(batch)
+            if progress:
+                progress(self.rows_done)
+        finally:
+            if self._report is not None:
+                self._report.close()
+            if self.inserted:
+                portfolio.invalidate()
+        return self.summary()
+
+    def summary(self) -> Dict[str, Any]:
+        report_id = os.path.splitext(os.path.basename(self.report_path))[0]
+        return {
+            "ok": True,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "error_report_url": f"/v1/import/reports/{report_id}.csv" if self.errors else None,
+        }
+
+def _bulk_job(path: str, fmt: str):
+    """Job body for a background price ingest of an upload spooled to path."""
+    def work(job: Job):
+        size = os.path.getsize(path) or 1
+        db = SessionLocal()
+        try:
+            with open(path, "rb") as raw:
+                lines = io.TextIOWrapper(raw, encoding="utf-8-sig", errors="ignore", newline="")
+                return PriceImport(db, new_report_path()).run(
+                    READERS[fmt](lines), progress=lambda n: job.progress(n, fraction=raw.tell() / size),
+                )
+        finally:
+            db.close()
+    return work
+
+@router.post("/bulk")
+def bulk_prices(
+    file: UploadFile = File(...),
+    background: bool = Query(False, description="Run as a job; poll /v1/jobs/{job_id}"),
+    db: Session = Depends(get_db),
+):
+    """Ingest sold comps from a .csv or .ndjson upload (one price per row/line)."""
+    fmt = FORMATS.get(os.path.splitext(file.filename or "")[1].lower())
+    if fmt is None:
+        raise HTTPException(400, "Please upload a .csv or .ndjson file")
+
+    if background:
+        # the upload is gone after this request, so keep a copy for the job
+        fd, path = tempfile.mkstemp(suffix=f".{fmt}", prefix="prices_")
+        with os.fdopen(fd, "wb") as out:
+            shutil.copyfileobj(file.file, out)
+        job = submit_or_429("import_prices", _bulk_job(path, fmt), {"filename": file.filename},
+                            on_done=lambda: os.remove(path))
+        return {"ok": True, "job_id": job.job_id, "status_url": f"/v1/jobs/{job.job_id}"}
+
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="ignore", newline="")
+    try:
+        return PriceImport(db, new_report_path()).run(READERS[fmt](lines))
+    finally:
+        lines.detach()
+
+def _stats_job(job: Job):
+    db = SessionLocal()
+    try:
+        try:
+            result = refresh_all_stats(db, progress=lambda done, total: job.progress(done, rows_total=total))
+        finally:
+            portfolio.invalidate()      # holdings are valued from price_stats
+        return {"ok": True, **result}
+    finally:
+        db.close()
+
+@router.post("/stats/refresh", status_code=202)
+def refresh_price_stats():
+    """Rebuild price_stats from every sale as a background job (prices written outside /bulk)."""
+    job = submit_or_429("price_stats", _stats_job)
+    return {"ok": True, "job_id": job.job_id, "status_url": f"/v1/jobs/{job.job_id}"}
+
+@router.get("", response_model=List[PriceOut])
+async def list_prices(
+    card_uuid: str = Query(...),
+    since: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    until: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    limit: int = Query(200, ge=1, le=5000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Price history of one card, newest sale first."""
+    q = select(Price).where(Price.card_uuid == card_uuid, Price.deleted_at.is_(None))
+    if since:
+        q = q.where(Price.sale_date >= since)
+    if until:
+        q = q.where(Price.sale_date <= until)
+    q = q.order_by(Price.sale_date.desc()).limit(limit)
+    return (await db.execute(q)).scalars().all()
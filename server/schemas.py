@@ -1,6 +1,8 @@
 # server/schemas.py
-from pydantic import BaseModel
-from typing import Optional
+import os
+
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from typing import Optional
 
 class CardBase(BaseModel):
@@ -23,11 +25,25 @@ class CardCreate(CardBase):
 class CardUpdate(CardBase):
     pass
 
+class PriceStatsOut(BaseModel):
+    grade_key: str
+    sales: int
+    last_sale_date: str
+    last_amount: float
+    median_30d: float
+    sales_30d: int
+    min_amount: float
+    max_amount: float
+
+    class Config:
+        from_attributes = True
+
 class CardOut(CardBase):
     card_uuid: str
     canonical_key: Optional[str] = None
     created_at: str
     updated_at: str
+    price: Optional[PriceStatsOut] = None   # list_cards with prices=true or sort=market_value
 
     class Config:
         from_attributes = True
@@ -53,4 +69,40 @@ class OwnershipOut(OwnershipBase):
     ownership_uuid: str
     created_at: str
     updated_at: str
-    class Config: from_attributes = True
\ No newline at end of file
+    card: Optional[CardOut] = None   # embedded by list_ownership
+    class Config: from_attributes = True
+
+class CardsBulkRequest(BaseModel):
+    card_uuids: List[str]
+
+class WishlistBulkRequest(CardsBulkRequest):
+    wishlisted: bool
+
+class OwnershipBulkCreate(BaseModel):
+    items: List[OwnershipCreate]
+
+class CardListsImportRequest(BaseModel):
+    root: Optional[str] = None              # CardLists root (baseball/, basketball/, ...)
+    release: Optional[str] = None           # or a single release JSON (needs sport)
+    sport: Optional[str] = None
+    include_categories: bool = False
+    engine: str = "bulk"                    # orm | bulk
+    workers: int = Field(1, ge=1, le=os.cpu_count() or 1)   # parse processes
+    incremental: bool = False
+
+class PriceOut(BaseModel):
+    price_uuid: str
+    card_uuid: str
+    condition_type: Optional[str] = None
+    grade_scale: Optional[str] = None
+    grade_value: Optional[str] = None
+    sale_date: Optional[str] = None
+    source_market: Optional[str] = None
+    source_lot_url: Optional[str] = None
+    amount_all_in: Optional[float] = None
+    currency: Optional[str] = None
+    is_ask_or_bid: Optional[str] = None
+    confidence: Optional[str] = None
+    notes: Optional[str] = None
+    created_at: str
+    class Config: from_attributes = True
@@ -26,4 +26,22 @@ settings = SimpleNamespace(
         "CORS_ORIGINS",
         "http://localhost:5173,http://127.0.0.1:5173,tauri://localhost",
     ),
+    # SQLite engine profile (server/db.py), applied to every new connection.
+    # WAL lets readers run while the importer writes; NORMAL is durable in WAL mode
+    # except for the last transactions on power loss.
+    sqlite_journal_mode=_get("SQLITE_JOURNAL_MODE", "WAL"),
+    sqlite_synchronous=_get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    sqlite_cache_size_kb=int(_get("SQLITE_CACHE_SIZE_KB", "32768")),        # page cache per connection
+    sqlite_mmap_size=int(_get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    sqlite_temp_store=_get("SQLITE_TEMP_STORE", "MEMORY"),
+    sqlite_busy_timeout_ms=int(_get("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    # pooled connections: enough for concurrent readers; writers queue on SQLite's lock
+    db_pool_size=int(_get("DB_POOL_SIZE", "8")),
+    db_max_overflow=int(_get("DB_MAX_OVERFLOW", "8")),
+    # background jobs (server/jobs.py): SQLite has one writer, so 1 worker by default
+    job_workers=int(_get("JOB_WORKERS", "1")),
+    job_queue_size=int(_get("JOB_QUEUE_SIZE", "8")),
+    # upload image pipeline (server/images.py): worker processes and max queued images
+    image_workers=int(_get("IMAGE_WORKERS", "2")),
+    image_queue_size=int(_get("IMAGE_QUEUE_SIZE", "32")),
 )
@@ -0,0 +1,163 @@
+# server/valuation.py
+"""
+Portfolio valuation. One SQL statement values every live holding: live
+ownership is summed per (card, grade), each of those is joined to its card
+and its price_stats row by primary key, and the result is summed per
+sport/year/set, so the cost follows the number of holdings, not the catalog.
+The market value of a holding is price_stats.median_30d (the median of the
+sales within 30 days of the card's last sale, the figure list_cards shows and
+sorts by): the per-sale work is done once by price ingestion (or the
+/v1/prices/stats/refresh job), not on every read. Python only rolls the
+groups up into the summary, which is cached until ownership or prices change
+(invalidate) or it is older than PORTFOLIO_MAX_AGE (imports and price loads
+can run out of process).
+
+Only SOLD rows (or rows without a kind) count as sales; asks and bids are not.
+price_paid is the cost of the whole ownership row, not per unit.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Float, and_, case, cast, func, literal, or_, select
+
+from .db import SessionLocal
+from .facets import product_label
+from .models import Card, Ownership, Price, PriceStat
+
+PORTFOLIO_MAX_AGE = 300      # seconds
+
+def grade_key(model):
+    """'RAW' or 'PSA:10' style key; ownership and prices join on it."""
+    scale = func.upper(func.coalesce(func.nullif(func.trim(model.grade_scale), ""), "RAW"))
+    return case(
+        (scale == "RAW", literal("RAW")),
+        else_=scale + ":" + func.coalesce(func.trim(model.grade_value), ""),
+    )
+
+def sold_prices():
+    """Live prices that are actual sales: asks and bids are not."""
+    return and_(
+        Price.deleted_at.is_(None),
+        Price.amount_all_in.isnot(None),
+        or_(Price.is_ask_or_bid.is_(None), func.upper(Price.is_ask_or_bid) == "SOLD"),
+    )
+
+def _holdings():
+    """Live owned rows summed per (card, grade), so the query is driven by the holdings, not the catalog."""
+    qty = func.coalesce(Ownership.quantity, 1)
+    with_cost = Ownership.price_paid.isnot(None)
+    return (
+        select(
+            Ownership.card_uuid.label("card_uuid"),
+            grade_key(Ownership).label("grade_key"),
+            func.count().label("holdings"),
+            func.sum(qty).label("quantity"),
+            func.sum(case((with_cost, qty), else_=0)).label("costed_quantity"),
+            func.sum(cast(Ownership.price_paid, Float)).label("paid"),
+        )
+        .where(
+            Ownership.deleted_at.is_(None),
+            or_(Ownership.status.is_(None), func.upper(Ownership.status) == "OWNED"),
+        )
+        .group_by(Ownership.card_uuid, grade_key(Ownership))
+        .subquery("holdings")
+    )
+
+def _group_rows(db) -> List[tuple]:
+    h = _holdings()
+    market = PriceStat.median_30d
+    priced = market.isnot(None)
+    stmt = (
+        select(
+            Card.sport, Card.year, Card.brand, Card.set_name,
+            func.sum(h.c.holdings).label("holdings"),
+            func.sum(h.c.quantity).label("quantity"),
+            func.sum(case((priced, h.c.quantity), else_=0)).label("priced"),
+            func.coalesce(func.sum(h.c.quantity * market), 0.0).label("market_value"),
+            func.coalesce(func.sum(h.c.paid), 0.0).label("cost_basis"),
+            # only holdings with both a market value and a price paid count toward the gain
+            func.coalesce(func.sum(case((priced, h.c.costed_quantity * market))), 0.0).label("valued_with_cost"),
+            func.coalesce(func.sum(case((priced, h.c.paid))), 0.0).label("cost_with_value"),
+        )
+        .select_from(h)
+        # primary-key probes per (card, grade) held
+        .join(Card, Card.card_uuid == h.c.card_uuid)
+        .outerjoin(PriceStat, and_(PriceStat.card_uuid == h.c.card_uuid, PriceStat.grade_key == h.c.grade_key))
+        .where(Card.deleted_at.is_(None))
+        .group_by(Card.sport, Card.year, Card.brand, Card.set_name)
+    )
+    return db.execute(stmt).all()
+
+_FIELDS = ("holdings", "quantity", "priced", "market_value", "cost_basis", "valued_with_cost", "cost_with_value")
+
+def _bucket(acc: Dict[Any, Dict[str, float]], key, row) -> None:
+    b = acc.setdefault(key, dict.fromkeys(_FIELDS, 0))
+    for f in _FIELDS:
+        b[f] += getattr(row, f)
+
+def _out(b: Dict[str, float], **labels) -> Dict[str, Any]:
+    return {
+        **labels,
+        "holdings": b["holdings"],
+        "quantity": b["quantity"],
+        "priced_quantity": b["priced"],
+        "market_value": round(b["market_value"], 2),
+        "cost_basis": round(b["cost_basis"], 2),
+        # only holdings with both a market value and a price paid
+        "unrealized_gain": round(b["valued_with_cost"] - b["cost_with_value"], 2),
+    }
+
+def compute_summary(db) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    total: Dict[Any, Dict[str, float]] = {}
+    sports: Dict[Any, Dict[str, float]] = {}
+    years: Dict[Any, Dict[str, float]] = {}
+    sets: Dict[Any, Dict[str, float]] = {}
+    for row in _group_rows(db):
+        sport = (row.sport or "").strip()
+        _bucket(total, None, row)
+        _bucket(sports, sport, row)
+        _bucket(years, (sport, row.year), row)
+        _bucket(sets, (sport, row.year, product_label(row.brand, row.set_name)), row)
+
+    by_value = lambda item: -item[1]["market_value"]
+    return {
+        "as_of": now.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "totals": _out(total.get(None) or dict.fromkeys(_FIELDS, 0)),
+        "by_sport": [_out(b, sport=s) for s, b in sorted(sports.items(), key=by_value)],
+        "by_year": [_out(b, sport=s, year=y) for (s, y), b in sorted(years.items(), key=by_value)],
+        "by_set": [_out(b, sport=s, year=y, product=p) for (s, y, p), b in sorted(sets.items(), key=by_value)],
+    }
+
+class Portfolio:
+    def __init__(self):
+        self._summary: Optional[Dict[str, Any]] = None
+        self._built_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def summary(self) -> Dict[str, Any]:
+        """Cached summary; blocks on a rebuild, so call off the event loop."""
+        with self._lock:
+            if self._summary is not None and time.monotonic() - self._built_at < PORTFOLIO_MAX_AGE:
+                return self._summary
+            generation = self._generation
+        db = SessionLocal()
+        try:
+            summary = compute_summary(db)
+        finally:
+            db.close()
+        with self._lock:
+            # a write that landed mid-build leaves the cache empty for the next read
+            if generation == self._generation:
+                self._summary, self._built_at = summary, time.monotonic()
+        return summary
+
+    def invalidate(self):
+        with self._lock:
+            self._summary = None
+            self._generation += 1
+
+portfolio = Portfolio()
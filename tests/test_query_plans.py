@@ -0,0 +1,187 @@
+# tests/test_query_plans.py
+"""
+Query-plan regression tests for the API's read queries.
+
+    python -m pytest -q tests/test_query_plans.py
+
+A module fixture migrates a throwaway SQLite DB to head, seeds a few rows and
+records every SELECT the app sends to SQLite (sync and async engines). Each
+endpoint in endpoints() is called through FastAPI's TestClient and every
+captured statement is re-run as EXPLAIN QUERY PLAN with its parameters. A
+plan fails on
+  - a full table scan ("SCAN <table>" without an index), or
+  - an index walk ("SCAN <table> USING [COVERING] INDEX ...") in a statement
+    without LIMIT, or whose rows feed a temp B-tree sort, since either reads
+    the whole index rather than one page,
+unless ALLOWED_SCANS lists that (path, table, index) with the reason it is
+intended.
+
+server.settings reads DB_PATH at import, so this module must be the first to
+import server in the session. Needs the API's dependencies plus httpx.
+"""
+import os, re, sys, shutil, sqlite3, tempfile, subprocess
+from typing import List, Tuple
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# whole-index walks that are intended: {(path, table, index): reason}
+ALLOWED_SCANS = {
+    ("/v1/cards", "cards", "ix_cards_live_browse"):
+        "total=exact counts the filtered live cards, cached for COUNT_CACHE_TTL; total=estimate caps it",
+    ("/v1/ownership", "ownership", "ix_ownership_card_live"):
+        "total counts live holdings off the covering index; one short walk per page request",
+    ("/v1/portfolio/summary", "ownership", "ix_ownership_card_live"):
+        "values every live holding by design; cached until a write or PORTFOLIO_MAX_AGE",
+    ("/v1/export/cards.ndjson", "cards", "ix_cards_live_created_at"):
+        "an export streams every live card in created_at order",
+}
+
+SORTS = ["updated_at", "created_at", "year", "player", "brand", "set_name", "card_no", "market_value"]
+
+def endpoints() -> List[Tuple[str, str, dict]]:
+    """(method, path, kwargs) for TestClient; {card} is replaced with a seeded card_uuid."""
+    eps = []
+    for sort in SORTS:
+        for order in ("asc", "desc"):
+            eps.append(("GET", "/v1/cards", {"params": {"sort": sort, "order": order, "page_size": 2}}))
+            eps.append(("GET", "/v1/cards", {"params": {"sort": sort, "order": order, "page_size": 2, "after": "{after:%s:%s}" % (sort, order)}}))
+    eps += [
+        ("GET", "/v1/cards", {"params": {"page": 2, "page_size": 2}}),
+        ("GET", "/v1/cards", {"params": {"wishlisted": True}}),
+        ("GET", "/v1/cards", {"params": {"sport": "Baseball"}}),
+        ("GET", "/v1/cards", {"params": {"sport": "Baseball", "year": 1990}}),
+        ("GET", "/v1/cards", {"params": {"sport": "Baseball", "year": 1990, "sort": "brand", "order": "asc"}}),
+        ("GET", "/v1/cards", {"params": {"year": 1990}}),
+        ("GET", "/v1/cards", {"params": {"q": "topps 1990"}}),
+        ("GET", "/v1/cards", {"params": {"q": "topps", "sort": "relevance"}}),
+        ("GET", "/v1/cards", {"params": {"q": "ab"}}),
+        ("GET", "/v1/cards", {"params": {"total": "estimate"}}),
+        ("GET", "/v1/cards", {"params": {"media": True}}),
+        ("GET", "/v1/cards", {"params": {"prices": True, "grade": "psa:10"}}),
+        # no PSA:10 sales: the page lies past the priced cards, among the unpriced ones
+        ("GET", "/v1/cards", {"params": {"sort": "market_value", "grade": "psa:10", "page": 2, "page_size": 2}}),
+        ("GET", "/v1/cards/{card}", {}),
+        ("GET", "/v1/cards/browse/sports", {}),
+        ("GET", "/v1/cards/browse/years", {"params": {"sport": "Baseball"}}),
+        ("GET", "/v1/cards/browse/products", {"params": {"sport": "Baseball", "year": 1990}}),
+        ("GET", "/v1/ownership", {}),
+        ("GET", "/v1/ownership", {"params": {"page": 2, "page_size": 1}}),
+        ("GET", "/v1/ownership", {"params": {"card_uuid": "{card}"}}),
+        ("GET", "/v1/ownership", {"params": {"q": "topps"}}),
+        ("GET", "/v1/portfolio/summary", {}),
+        ("GET", "/v1/prices", {"params": {"card_uuid": "{card}", "since": "2020-01-01"}}),
+        ("GET", "/v1/media", {"params": {"card_uuid": "{card}"}}),
+        ("GET", "/v1/media/latest", {"params": {"card_uuid": "{card}"}}),
+        ("GET", "/v1/media/pair", {"params": {"card_uuid": "{card}"}}),
+        ("POST", "/v1/media/pairs", {"json": {"card_uuids": ["{card}"]}}),
+        ("GET", "/v1/export/cards.csv", {"params": {"sport": "Baseball"}}),
+        ("GET", "/v1/export/cards.ndjson", {}),
+    ]
+    return eps
+
+def seed(client) -> dict:
+    ids = []
+    for i, (sport, year, brand) in enumerate([("Baseball", 1990, "Topps"), ("Baseball", 1991, "Donruss"),
+                                              ("Hockey", 1990, "OPC"), ("Baseball", 1990, "Fleer")]):
+        r = client.post("/v1/cards", json={"sport": sport, "year": year, "brand": brand, "set_name": "Base",
+                                           "card_no": str(i), "player": f"Player {i}"})
+        ids.append(r.json()["card_uuid"])
+    client.post(f"/v1/cards/{ids[0]}/wishlist", json={"wishlisted": True})
+    client.post("/v1/ownership", json={"card_uuid": ids[0]})
+    sales = "card_uuid,sale_date,amount_all_in\n" + "".join(f"{c},2026-01-0{i + 1},{i + 1}\n" for i, c in enumerate(ids))
+    client.post("/v1/prices/bulk", files={"file": ("sales.csv", sales)})
+    return {"card": ids[0]}
+
+def resolve(value, client, ctx):
+    if isinstance(value, dict):
+        return {k: resolve(v, client, ctx) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve(v, client, ctx) for v in value]
+    if isinstance(value, str):
+        m = re.fullmatch(r"\{after:(\w+):(\w+)\}", value)
+        if m:
+            r = client.get("/v1/cards", params={"sort": m.group(1), "order": m.group(2), "page_size": 2})
+            return r.json()["next_after"]
+        return value.replace("{card}", ctx["card"])
+    return value
+
+
+@pytest.fixture(scope="module")
+def api():
+    work = tempfile.mkdtemp(prefix="qplan_")
+    cwd, db_path = os.getcwd(), os.environ.get("DB_PATH")
+    os.environ["DB_PATH"] = os.path.join(work, "plans.sqlite")
+    r = subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=ROOT,
+                       capture_output=True, text=True, env=os.environ)
+    assert r.returncode == 0, r.stderr
+    os.chdir(work)   # media/ and reports/ land in the temp dir
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from server.db import engine, async_engine
+    from server.main import app
+
+    client = TestClient(app)
+    ctx = seed(client)
+    captured: List[Tuple[str, tuple]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append((statement, tuple(parameters or ())))
+    for e in (engine, async_engine.sync_engine):
+        event.listen(e, "before_cursor_execute", capture)
+    plans = sqlite3.connect(os.environ["DB_PATH"])
+    try:
+        yield client, ctx, captured, plans
+    finally:
+        plans.close()
+        for e in (engine, async_engine.sync_engine):
+            event.remove(e, "before_cursor_execute", capture)
+        engine.dispose()
+        os.chdir(cwd)
+        if db_path is None:
+            os.environ.pop("DB_PATH", None)
+        else:
+            os.environ["DB_PATH"] = db_path
+        shutil.rmtree(work, ignore_errors=True)
+
+def _bad_scans(path: str, statement: str, details: List[str], tables: set) -> List[str]:
+    # LIMIT only stops a walk that already yields rows in order, not one feeding a sort
+    bounded = (re.search(r"\bLIMIT\b", statement, re.I) is not None
+               and not any(d.startswith("USE TEMP B-TREE FOR") and "ORDER BY" in d for d in details))
+    bad = []
+    for d in details:
+        m = re.fullmatch(r"SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?", d)
+        # "SCAN anon_1" walks a subquery's co-routine, not a table
+        if not m or m.group(1) not in tables:
+            continue
+        table, index = m.groups()
+        if index is None or not (bounded or (path, table, index) in ALLOWED_SCANS):
+            bad.append(d)
+    return bad
+
+def _label(ep) -> str:
+    method, path, kwargs = ep
+    return f"{method} {path} {kwargs.get('params') or kwargs.get('json') or ''}".strip()
+
+@pytest.mark.parametrize("method, path, kwargs", endpoints(), ids=[_label(ep) for ep in endpoints()])
+def test_no_unbounded_scans(api, method, path, kwargs):
+    client, ctx, captured, plans = api
+    kwargs = resolve(kwargs, client, ctx)
+    url = resolve(path, client, ctx)
+    captured.clear()
+    r = client.request(method, url, **kwargs)
+    assert r.status_code < 400, r.text[:200]
+
+    tables = {row[0] for row in plans.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    failures = []
+    for statement, params in captured:
+        details = [row[-1] for row in plans.execute("EXPLAIN QUERY PLAN " + statement, params)]
+        bad = _bad_scans(path, statement, details, tables)
+        if bad:
+            failures.append(" ".join(statement.split())[:300] + "\n  " + "\n  ".join(details))
+    assert not failures, "\n\n".join(failures)